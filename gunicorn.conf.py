@@ -0,0 +1,28 @@
+"""
+gunicorn -c gunicorn.conf.py reservation_System.wsgi
+
+Воркеры пишут метрики в общий каталог, /metrics в любом воркере отдаёт
+сумму по всем. Каталог очищается при старте мастера. Celery-воркеры
+запускаются с тем же PROMETHEUS_MULTIPROC_DIR — тогда их метрики тоже
+попадают в /metrics.
+
+SSE-поток /api/reservation/availability/stream/ под WSGI не работает —
+его обслуживает отдельный ASGI-сервер (см. reservation/streams.py).
+"""
+import os
+import shutil
+import tempfile
+
+multiproc_dir = os.environ.setdefault(
+    "PROMETHEUS_MULTIPROC_DIR", os.path.join(tempfile.gettempdir(), "booking-prometheus")
+)
+
+
+def on_starting(server):
+    shutil.rmtree(multiproc_dir, ignore_errors=True)
+    os.makedirs(multiproc_dir, exist_ok=True)
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
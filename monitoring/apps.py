@@ -0,0 +1,16 @@
+from django.apps import AppConfig
+
+
+class MonitoringConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'monitoring'
+
+    def ready(self):
+        from django.conf import settings
+        from . import log, profiling, slow_queries, task_metrics
+        log.connect()
+        if settings.METRICS_ENABLED:
+            profiling.install()
+            task_metrics.connect()
+        if slow_queries.enabled():
+            slow_queries.connect()
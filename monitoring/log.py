@@ -0,0 +1,168 @@
+"""
+Логирование без записи в поток на потоке запроса: AsyncJsonHandler кладёт
+запись в очередь, а JSON-строку пишет QueueListener в своём потоке.
+Каждая запись несёт request_id — он берётся из X-Request-ID (или
+генерируется) в RequestIdMiddleware и уходит заголовком в задачи Celery,
+поставленные во время запроса. SamplingFilter пропускает только долю
+записей шумных логгеров (django.db.backends на DEBUG).
+"""
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import re
+import sys
+import uuid
+from contextvars import ContextVar
+from datetime import datetime, timezone
+
+import orjson
+from celery import signals
+
+HEADER = "request_id"
+_VALID_ID = re.compile(r"^[A-Za-z0-9._-]{1,64}$")
+
+request_id = ContextVar("request_id", default=None)
+
+
+def new_request_id(incoming=None):
+    """ Id из заголовка клиента или прокси, если он похож на id, иначе новый. """
+    if incoming and _VALID_ID.match(incoming):
+        return incoming
+    return uuid.uuid4().hex
+
+
+class RequestIdFilter(logging.Filter):
+    """ Добавляет record.request_id; должен стоять на обработчике, чтобы сработать в потоке запроса. """
+
+    def filter(self, record):
+        record.request_id = request_id.get()
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """
+    rates — {префикс логгера: доля}. Записи этих логгеров ниже WARNING
+    проходят с вероятностью доли, предупреждения и ошибки — всегда.
+    """
+
+    def __init__(self, rates=None):
+        super().__init__()
+        self.rates = sorted((rates or {}).items(), key=lambda item: -len(item[0]))
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+        for prefix, rate in self.rates:
+            if record.name == prefix or record.name.startswith(prefix + "."):
+                return random.random() < rate
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """ Одна запись — одна JSON-строка. """
+
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "request_id": getattr(record, "request_id", None),
+            "process": record.process,
+        }
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return orjson.dumps(entry, default=str).decode()
+
+
+class AsyncJsonHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler со своим QueueListener: в потоке вызова только фильтры и
+    getMessage(), запись JSON в stream — в потоке слушателя. Очередь
+    ограничена maxsize: при переполнении записи отбрасываются, а не
+    блокируют запрос. После fork (prefork-воркеры Celery, gunicorn с
+    --preload) слушатель запускается заново в дочернем процессе.
+    """
+
+    def __init__(self, stream=None, maxsize=10_000):
+        self.maxsize = maxsize
+        self.target = logging.StreamHandler(stream or sys.stderr)
+        self.target.setFormatter(JsonFormatter())
+        self.dropped = 0
+        self.listener = None
+        super().__init__(queue.Queue(maxsize))
+        self._start()
+        os.register_at_fork(after_in_child=self._restart_in_child)
+
+    def _start(self):
+        self.listener = logging.handlers.QueueListener(self.queue, self.target)
+        self.listener.start()
+
+    def _stop(self):
+        if self.listener is not None:
+            self.listener.stop()
+            self.listener = None
+
+    def _restart_in_child(self):
+        # Поток слушателя родителя в дочерний процесс не переходит
+        if self.listener is not None:
+            self.queue = queue.Queue(self.maxsize)
+            self._start()
+
+    def prepare(self, record):
+        # Текст и traceback готовятся здесь: args и exc_info могут не пережить передачу в другой поток
+        record = logging.makeLogRecord(record.__dict__)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = self.target.formatter.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def flush(self):
+        """ Дождаться записи всего, что уже в очереди (тесты, завершение процесса). """
+        if self.listener is not None:
+            self._stop()
+            self._start()
+        self.target.flush()
+
+    def close(self):
+        self._stop()
+        self.target.close()
+        super().close()
+
+
+def inject_request_id(headers=None, **kwargs):
+    """ before_task_publish: задача, поставленная из запроса, получает его request_id. """
+    current = request_id.get()
+    if headers is not None and current and HEADER not in headers:
+        headers[HEADER] = current
+
+
+_task_tokens = {}
+
+
+def bind_task_request_id(task_id=None, task=None, **kwargs):
+    incoming = getattr(task.request, HEADER, None) or (getattr(task.request, "headers", None) or {}).get(HEADER)
+    _task_tokens[task_id] = request_id.set(incoming or task_id)
+
+
+def unbind_task_request_id(task_id=None, **kwargs):
+    token = _task_tokens.pop(task_id, None)
+    if token is not None:
+        request_id.reset(token)
+
+
+def connect():
+    """ Передача request_id через заголовки Celery (из MonitoringConfig.ready). """
+    signals.before_task_publish.connect(inject_request_id)
+    signals.task_prerun.connect(bind_task_request_id)
+    signals.task_postrun.connect(unbind_task_request_id)
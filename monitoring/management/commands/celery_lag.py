@@ -0,0 +1,57 @@
+import time
+
+import redis
+from django.core.management.base import BaseCommand, CommandError
+
+from monitoring import task_metrics
+
+
+def percentile(values, share):
+    """ Значение, ниже которого доля share отсортированной выборки. """
+    if not values:
+        return 0.0
+    return values[min(int(len(values) * share), len(values) - 1)]
+
+
+class Command(BaseCommand):
+    help = (
+        "Сводка по задачам Celery из последних замеров воркеров: задержка старта "
+        "относительно eta (p50/p95/max), время выполнения, повторы и длина очередей. "
+        "С --watch N обновляется каждые N секунд."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--watch", type=float, default=0)
+
+    def handle(self, *args, **options):
+        while True:
+            try:
+                self.stdout.write(self.summary())
+            except redis.RedisError as e:
+                raise CommandError(f"Redis недоступен: {e}")
+            if not options["watch"]:
+                return
+            time.sleep(options["watch"])
+
+    def summary(self):
+        client = task_metrics.get_client()
+        lines = [time.strftime("%H:%M:%S")]
+        queues = task_metrics.queue_lengths()
+        lines.append("Очереди: " + (", ".join(f"{name}={length}" for name, length in queues.items()) or "нет данных"))
+
+        names = sorted(name.decode() for name in client.smembers(task_metrics.TASKS_KEY))
+        retries = {key.decode(): int(value) for key, value in client.hgetall(task_metrics.RETRIES_KEY).items()}
+        lines.append(
+            f"{'задача':<50} {'n':>5} {'лаг p50':>8} {'p95':>8} {'max':>8} "
+            f"{'время p50':>10} {'p95':>8} {'повторы':>8}"
+        )
+        for name in names:
+            samples = [raw.decode().split() for raw in client.lrange(task_metrics.stats_key(name), 0, -1)]
+            lags = sorted(float(lag) for lag, _ in samples)
+            runtimes = sorted(float(runtime) for _, runtime in samples)
+            lines.append(
+                f"{name:<50} {len(samples):>5} {percentile(lags, .5):>8.2f} {percentile(lags, .95):>8.2f} "
+                f"{max(lags, default=0):>8.2f} {percentile(runtimes, .5):>10.3f} "
+                f"{percentile(runtimes, .95):>8.3f} {retries.get(name, 0):>8}"
+            )
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,69 @@
+"""
+Метрики Prometheus. Под gunicorn каждый воркер пишет значения в файлы
+каталога PROMETHEUS_MULTIPROC_DIR (задаётся в gunicorn.conf.py до импорта
+prometheus_client), а /metrics собирает их вместе. Без переменной метрики
+живут в памяти процесса — так работают runserver и тесты.
+"""
+import os
+
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Histogram, generate_latest
+from prometheus_client import multiprocess
+
+SQL_COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100, 200)
+PHASE_BUCKETS = (.0005, .001, .0025, .005, .01, .025, .05, .1, .25, .5, 1, 2.5)
+
+REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds", "Время ответа по маршрутам", ["route", "method", "status"],
+)
+REQUEST_SQL_QUERIES = Histogram(
+    "http_request_sql_queries", "Число SQL-запросов на запрос", ["route"], buckets=SQL_COUNT_BUCKETS,
+)
+REQUEST_SQL_SECONDS = Histogram(
+    "http_request_sql_seconds", "Суммарное время SQL на запрос", ["route"],
+)
+REQUEST_PHASE_SECONDS = Histogram(
+    "http_request_phase_seconds", "Время сериализации и рендеринга на запрос", ["route", "phase"],
+    buckets=PHASE_BUCKETS,
+)
+
+
+def route_name(request):
+    """
+    Маршрут без параметров: ViewSet.action для DRF (ReservationViewSet.create),
+    имя URL для остального (admin:reservation_reservation_changelist).
+    """
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        return "unmatched"
+    cls = getattr(match.func, "cls", None)
+    if cls is None:
+        return match.view_name or match._func_path
+    method = request.method.lower()
+    actions = getattr(match.func, "actions", None) or {}
+    return f"{cls.__name__}.{actions.get(method, method)}"
+
+
+def observe_request(request, response, seconds, profile=None):
+    route = route_name(request)
+    REQUEST_SECONDS.labels(route, request.method, str(response.status_code)).observe(seconds)
+    if profile is None:
+        return
+    REQUEST_SQL_QUERIES.labels(route).observe(profile.queries)
+    REQUEST_SQL_SECONDS.labels(route).observe(profile.sql_seconds)
+    for name, phase_seconds in profile.phases.items():
+        REQUEST_PHASE_SECONDS.labels(route, name).observe(phase_seconds)
+
+
+def exposition():
+    """
+    (текст метрик, content-type) — по всем воркерам gunicorn и Celery, если
+    включён multiprocess, плюс длина очередей брокера на момент запроса.
+    """
+    from .task_metrics import live_registry
+
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry) + generate_latest(live_registry), CONTENT_TYPE_LATEST
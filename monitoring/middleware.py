@@ -0,0 +1,109 @@
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+
+from . import log, metrics, profiling, slow_queries
+
+
+class RequestMetricsMiddleware:
+    """
+    Время ответа, число и время SQL, время сериализации и рендеринга по
+    маршрутам. Стоит в MIDDLEWARE сразу за RequestIdMiddleware (та только
+    читает заголовок), чтобы учитывать остальные middleware. Для async-view (SSE) пишется только время до начала ответа:
+    ORM там работает в других потоках, и SQL этим wrapper'ом не видно.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        profile, token = profiling.start()
+        started = time.perf_counter()
+        try:
+            with connection.execute_wrapper(profile.sql_wrapper):
+                response = self.get_response(request)
+        finally:
+            profiling.finish(token)
+        metrics.observe_request(request, response, time.perf_counter() - started, profile)
+        return response
+
+    async def __acall__(self, request):
+        started = time.perf_counter()
+        response = await self.get_response(request)
+        metrics.observe_request(request, response, time.perf_counter() - started)
+        return response
+
+
+class SlowQueryMiddleware:
+    """
+    Журнал медленных запросов (monitoring.slow_queries) для sync-view.
+    Источник — маршрут view, он известен только после разрешения URL.
+    Async-view пропускаются как есть.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not slow_queries.enabled():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.get_response(request)
+        token = slow_queries.set_origin(request.path)
+        try:
+            with connection.execute_wrapper(slow_queries.capture):
+                return self.get_response(request)
+        finally:
+            slow_queries.reset_origin(token)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        slow_queries.set_origin(metrics.route_name(request))
+
+
+class RequestIdMiddleware:
+    """
+    request_id для логов запроса и задач, которые он поставит. Берётся из
+    X-Request-ID (если прокси его проставил) и возвращается в ответе.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = log.request_id.set(log.new_request_id(request.headers.get("X-Request-ID")))
+        try:
+            response = self.get_response(request)
+            response["X-Request-ID"] = log.request_id.get()
+            return response
+        finally:
+            log.request_id.reset(token)
+
+    async def __acall__(self, request):
+        token = log.request_id.set(log.new_request_id(request.headers.get("X-Request-ID")))
+        try:
+            response = await self.get_response(request)
+            response["X-Request-ID"] = log.request_id.get()
+            return response
+        finally:
+            log.request_id.reset(token)
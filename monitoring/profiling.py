@@ -0,0 +1,81 @@
+"""
+Профиль текущего запроса: число и время SQL, время фаз (сериализация,
+рендеринг). Профиль лежит в contextvar, вне запроса (Celery, команды)
+его нет, и замеры ничего не стоят, кроме одной проверки.
+"""
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+_current = ContextVar("request_profile", default=None)
+
+
+class Profile:
+    __slots__ = ("queries", "sql_seconds", "phases", "_active")
+
+    def __init__(self):
+        self.queries = 0
+        self.sql_seconds = 0.0
+        self.phases = {}
+        self._active = set()
+
+    def sql_wrapper(self, execute, sql, params, many, context):
+        """ Для connection.execute_wrapper: считает запросы и их время. """
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql_seconds += time.perf_counter() - started
+            self.queries += 1
+
+
+def start():
+    """ Новый профиль для запроса. Возвращает (профиль, токен для finish). """
+    profile = Profile()
+    return profile, _current.set(profile)
+
+
+def finish(token):
+    _current.reset(token)
+
+
+@contextmanager
+def phase(name):
+    """ Добавляет время блока к фазе name текущего профиля. Вложенные замеры той же фазы не суммируются. """
+    profile = _current.get()
+    if profile is None or name in profile._active:
+        yield
+        return
+    profile._active.add(name)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile._active.discard(name)
+        profile.phases[name] = profile.phases.get(name, 0.0) + time.perf_counter() - started
+
+
+class _TimedProperty(property):
+    """ property, чьё чтение засчитывается в фазу профиля. """
+
+    def __init__(self, prop, name):
+        def fget(instance):
+            with phase(name):
+                return prop.fget(instance)
+        super().__init__(fget, prop.fset, prop.fdel, prop.__doc__)
+
+
+def install():
+    """
+    Замер serializer.data и рендеринга ответа DRF во всех view сразу.
+    Быстрый путь чтения (reservation.rows) размечает свою фазу сам.
+    """
+    from rest_framework.response import Response
+    from rest_framework.serializers import BaseSerializer, ListSerializer, Serializer
+
+    targets = [(cls, "data", "serialize") for cls in (BaseSerializer, Serializer, ListSerializer)]
+    targets.append((Response, "rendered_content", "render"))
+    for cls, attr, name in targets:
+        prop = vars(cls).get(attr)
+        if isinstance(prop, property) and not isinstance(prop, _TimedProperty):
+            setattr(cls, attr, _TimedProperty(prop, name))
@@ -0,0 +1,132 @@
+"""
+Журнал медленных запросов (включается SLOW_QUERY_ENABLED). Запрос дольше
+SLOW_QUERY_THRESHOLD_MS попадает в Redis ZSET с длительностью в качестве
+веса, хранятся SLOW_QUERY_KEEP худших. Для доли SLOW_QUERY_EXPLAIN_RATE
+медленных SELECT сразу снимается EXPLAIN (ANALYZE, BUFFERS) с теми же
+параметрами — это повторное выполнение, поэтому только выборка и только
+SELECT. Источник — маршрут view или имя задачи Celery из contextvar.
+В журнал пишется SQL с плейсхолдерами, без значений параметров.
+"""
+import json
+import logging
+import random
+import time
+from contextvars import ContextVar
+
+import redis
+from celery import signals
+from django.conf import settings
+from django.db import connections, transaction
+
+logger = logging.getLogger(__name__)
+
+KEY = "monitoring:slow_queries"
+
+_origin = ContextVar("slow_query_origin", default=None)
+_explaining = ContextVar("slow_query_explaining", default=False)
+_client = None
+
+
+def get_client():
+    global _client
+    if _client is None:
+        _client = redis.Redis.from_url(
+            settings.SLOW_QUERY_REDIS_URL, socket_timeout=0.2, socket_connect_timeout=0.2
+        )
+    return _client
+
+
+def enabled():
+    return getattr(settings, "SLOW_QUERY_ENABLED", False)
+
+
+def set_origin(name):
+    """ Источник следующих запросов. Возвращает токен для reset_origin. """
+    return _origin.set(name)
+
+
+def reset_origin(token):
+    _origin.reset(token)
+
+
+def explain(alias, sql, params):
+    """ План с фактическим временем и буферами; None, если снять не удалось. """
+    token = _explaining.set(True)
+    try:
+        # Ошибка EXPLAIN не должна ломать транзакцию запроса — отдельная точка сохранения
+        with transaction.atomic(using=alias):
+            with connections[alias].cursor() as cursor:
+                cursor.execute(f"EXPLAIN (ANALYZE, BUFFERS) {sql}", params)
+                return "\n".join(row[0] for row in cursor.fetchall())
+    except Exception:
+        logger.warning("Не удалось снять план медленного запроса", exc_info=True)
+        return None
+    finally:
+        _explaining.reset(token)
+
+
+def record(entry):
+    try:
+        pipe = get_client().pipeline()
+        pipe.zadd(KEY, {json.dumps(entry, ensure_ascii=False): entry["duration_ms"]})
+        pipe.zremrangebyrank(KEY, 0, -settings.SLOW_QUERY_KEEP - 1)
+        pipe.execute()
+    except redis.RedisError:
+        logger.warning("Не удалось записать медленный запрос", exc_info=True)
+
+
+def capture(execute, sql, params, many, context):
+    """ Для connection.execute_wrapper. """
+    if _explaining.get():
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    result = execute(sql, params, many, context)
+    duration_ms = (time.perf_counter() - started) * 1000
+    if duration_ms >= settings.SLOW_QUERY_THRESHOLD_MS:
+        alias = context["connection"].alias
+        plan = None
+        if not many and sql.lstrip()[:6].upper() == "SELECT" and random.random() < settings.SLOW_QUERY_EXPLAIN_RATE:
+            plan = explain(alias, sql, params)
+        record({
+            "sql": sql, "duration_ms": round(duration_ms, 1), "origin": _origin.get() or "неизвестно",
+            "database": alias, "at": time.time(), "plan": plan,
+        })
+    return result
+
+
+def worst(limit=None):
+    """ Записи журнала от самой долгой. """
+    limit = limit or settings.SLOW_QUERY_KEEP
+    return [json.loads(raw) for raw in get_client().zrevrange(KEY, 0, limit - 1)]
+
+
+def clear():
+    get_client().delete(KEY)
+
+
+_task_state = {}
+
+
+def task_started(sender=None, task_id=None, task=None, **kwargs):
+    connection = connections["default"]
+    # Eager-задача внутри запроса: wrapper уже стоит, меняем только источник
+    added = capture not in connection.execute_wrappers
+    if added:
+        connection.execute_wrappers.append(capture)
+    _task_state[task_id] = (set_origin(f"task:{task.name}"), connection if added else None)
+
+
+def task_finished(sender=None, task_id=None, **kwargs):
+    state = _task_state.pop(task_id, None)
+    if state is None:
+        return
+    token, connection = state
+    if connection is not None and capture in connection.execute_wrappers:
+        connection.execute_wrappers.remove(capture)
+    reset_origin(token)
+
+
+def connect():
+    """ Журнал для задач Celery (из MonitoringConfig.ready, если SLOW_QUERY_ENABLED). """
+    signals.task_prerun.connect(task_started)
+    signals.task_postrun.connect(task_finished)
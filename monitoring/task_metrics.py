@@ -0,0 +1,160 @@
+"""
+Метрики Celery: задержка старта относительно eta (или момента отправки),
+время выполнения, повторы и длина очередей в Redis-брокере.
+
+Задержка считается по заголовку published_at, который ставится при
+отправке задачи. Воркеры пишут метрики в тот же PROMETHEUS_MULTIPROC_DIR,
+что и gunicorn (переменная окружения задаётся обоим), поэтому задачи
+видны в /metrics веб-приложения. Последние замеры по каждой задаче
+дополнительно лежат в Redis — их показывает команда celery_lag.
+"""
+import logging
+import time
+from datetime import datetime
+
+import redis
+from celery import signals
+from django.conf import settings
+from prometheus_client import CollectorRegistry, Counter, Histogram
+from prometheus_client.core import GaugeMetricFamily
+
+logger = logging.getLogger(__name__)
+
+PUBLISHED_HEADER = "published_at"
+TASKS_KEY = "celery:stats:tasks"
+RETRIES_KEY = "celery:stats:retries"
+LAG_BUCKETS = (.01, .05, .1, .5, 1, 5, 10, 30, 60, 120, 300, 600, 1800)
+
+TASK_LAG_SECONDS = Histogram(
+    "celery_task_lag_seconds", "Задержка старта задачи относительно eta или отправки", ["task"],
+    buckets=LAG_BUCKETS,
+)
+TASK_RUNTIME_SECONDS = Histogram(
+    "celery_task_runtime_seconds", "Время выполнения задачи", ["task", "state"],
+)
+TASK_RETRIES = Counter(
+    "celery_task_retries", "Повторы задач", ["task"],
+)
+ACTION_LAG_SECONDS = Histogram(
+    "reservation_action_lag_seconds", "Опоздание напоминаний и автоотмен относительно плана", ["action"],
+    buckets=LAG_BUCKETS,
+)
+
+_client = None
+_started = {}
+
+
+def get_client():
+    global _client
+    if _client is None:
+        _client = redis.Redis.from_url(
+            settings.CELERY_BROKER_URL, socket_timeout=0.2, socket_connect_timeout=0.2
+        )
+    return _client
+
+
+def stats_key(task_name):
+    return f"celery:stats:{task_name}"
+
+
+def queue_lengths():
+    """ {очередь: число сообщений} по LLEN в брокере; пусто, если Redis недоступен. """
+    queues = settings.TASK_METRICS_QUEUES
+    try:
+        pipe = get_client().pipeline(transaction=False)
+        for queue in queues:
+            pipe.llen(queue)
+        return dict(zip(queues, pipe.execute()))
+    except redis.RedisError:
+        logger.warning("Не удалось получить длину очередей Celery", exc_info=True)
+        return {}
+
+
+class QueueLengthCollector:
+    """ Длина очередей читается в момент сбора метрик, а не хранится в процессе. """
+
+    def collect(self):
+        family = GaugeMetricFamily("celery_queue_length", "Сообщений в очереди брокера", labels=["queue"])
+        for queue, length in queue_lengths().items():
+            family.add_metric([queue], length)
+        yield family
+
+
+live_registry = CollectorRegistry(auto_describe=False)
+live_registry.register(QueueLengthCollector())
+
+
+def observe_action_lag(action, seconds):
+    """ Опоздание действий над бронями (sweeper и пакетная автоотмена). """
+    histogram = ACTION_LAG_SECONDS.labels(action)
+    for value in seconds:
+        histogram.observe(max(value, 0))
+
+
+def _timestamp(value):
+    if value is None:
+        return None
+    if isinstance(value, str):
+        return datetime.fromisoformat(value).timestamp()
+    return float(value)
+
+
+def _header(request, name):
+    value = getattr(request, name, None)
+    if value is None:
+        value = (getattr(request, "headers", None) or {}).get(name)
+    return value
+
+
+def mark_published(sender=None, headers=None, **kwargs):
+    if headers is not None:
+        headers[PUBLISHED_HEADER] = time.time()
+
+
+def task_started(sender=None, task_id=None, task=None, **kwargs):
+    started = time.time()
+    _started[task_id] = time.perf_counter()
+    published = _timestamp(_header(task.request, PUBLISHED_HEADER))
+    if published is None:  # Eager-вызов или задача от старого кода
+        task.request.lag_seconds = None
+        return
+    # Для отложенных задач отсчёт от eta: ожидание до eta — не опоздание
+    eta = _timestamp(_header(task.request, "eta"))
+    lag = max(started - max(published, eta or 0), 0)
+    task.request.lag_seconds = lag
+    TASK_LAG_SECONDS.labels(task.name).observe(lag)
+
+
+def task_finished(sender=None, task_id=None, task=None, state=None, **kwargs):
+    started = _started.pop(task_id, None)
+    if started is None:
+        return
+    runtime = time.perf_counter() - started
+    TASK_RUNTIME_SECONDS.labels(task.name, state or "UNKNOWN").observe(runtime)
+    lag = getattr(task.request, "lag_seconds", None)
+    if lag is None:  # Eager-вызовы в сводку не попадают, их время есть в гистограмме
+        return
+    try:
+        pipe = get_client().pipeline(transaction=False)
+        pipe.sadd(TASKS_KEY, task.name)
+        pipe.lpush(stats_key(task.name), f"{lag:.3f} {runtime:.3f}")
+        pipe.ltrim(stats_key(task.name), 0, settings.TASK_METRICS_SAMPLES - 1)
+        pipe.execute()
+    except redis.RedisError:
+        logger.warning("Не удалось сохранить замер задачи %s", task.name, exc_info=True)
+
+
+def task_retried(sender=None, **kwargs):
+    TASK_RETRIES.labels(sender.name).inc()
+    try:
+        get_client().hincrby(RETRIES_KEY, sender.name, 1)
+    except redis.RedisError:
+        logger.warning("Не удалось учесть повтор задачи %s", sender.name, exc_info=True)
+
+
+def connect():
+    """ Подключает сигналы Celery (из MonitoringConfig.ready, если METRICS_ENABLED). """
+    signals.before_task_publish.connect(mark_published)
+    signals.task_prerun.connect(task_started)
+    signals.task_postrun.connect(task_finished)
+    signals.task_retry.connect(task_retried)
@@ -0,0 +1,146 @@
+import io
+import logging
+import time
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from unittest import mock
+
+import orjson
+import redis
+from django.test import TestCase, override_settings
+from prometheus_client import REGISTRY
+from rest_framework.test import APIClient
+
+from monitoring import log, slow_queries, task_metrics
+from tables.models import Table
+from users.models import User
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+@override_settings(TABLE_CACHE_ENABLED=False, METRICS_TOKEN="secret")
+class RequestMetricsTests(TestCase):
+
+    def test_route_sql_and_phases_are_recorded(self):
+        user = User.objects.create_user("guest@example.com", "+70000000001", "secret123", is_staff=True)
+        Table.objects.create(number=1, seats=4, type="standard")
+        client = APIClient()
+        client.force_authenticate(user)
+        route = {"route": "TableViewSet.list"}
+        before = sample("http_request_sql_queries_sum", **route)
+
+        with self.assertNumQueries(1):
+            self.assertEqual(client.get("/api/table/tables/").status_code, 200)
+
+        self.assertEqual(sample("http_request_sql_queries_sum", **route) - before, 1)
+        self.assertGreater(sample("http_request_phase_seconds_count", phase="serialize", **route), 0)
+        self.assertGreater(sample("http_request_phase_seconds_count", phase="render", **route), 0)
+
+        response = client.get("/metrics", HTTP_AUTHORIZATION="Bearer secret")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'route="TableViewSet.list"', response.content)
+
+    def test_token_required_when_configured(self):
+        self.assertEqual(self.client.get("/metrics").status_code, 403)
+        self.assertEqual(self.client.get("/metrics", HTTP_AUTHORIZATION="Bearer wrong").status_code, 403)
+        self.assertEqual(self.client.get("/metrics", HTTP_AUTHORIZATION="Bearer secret").status_code, 200)
+
+    @override_settings(METRICS_TOKEN=None)
+    def test_closed_without_token_outside_debug(self):
+        self.assertEqual(self.client.get("/metrics").status_code, 403)
+        with self.settings(DEBUG=True):
+            self.assertEqual(self.client.get("/metrics").status_code, 200)
+
+
+class TaskLagTests(TestCase):
+
+    def test_lag_counts_from_eta_not_from_publish(self):
+        task = mock.Mock()
+        task.name = "reservation.tasks.auto_cancel_reservation"
+        published = time.time() - 600
+        eta = datetime.fromtimestamp(time.time() - 30, tz=timezone.utc).isoformat()
+        task.request = SimpleNamespace(published_at=published, eta=eta)
+        labels = {"task": task.name}
+        before = sample("celery_task_lag_seconds_sum", **labels)
+
+        with mock.patch.object(task_metrics, "get_client", side_effect=redis.RedisError), \
+                self.assertLogs("monitoring.task_metrics", "WARNING"):
+            task_metrics.task_started(task_id="t1", task=task)
+            task_metrics.task_finished(task_id="t1", task=task, state="SUCCESS")
+
+        self.assertAlmostEqual(sample("celery_task_lag_seconds_sum", **labels) - before, 30, delta=5)
+        self.assertEqual(sample("celery_task_runtime_seconds_count", state="SUCCESS", **labels), 1)
+
+
+@override_settings(SLOW_QUERY_ENABLED=True, SLOW_QUERY_THRESHOLD_MS=0, SLOW_QUERY_EXPLAIN_RATE=1,
+                   TABLE_CACHE_ENABLED=False)
+class SlowQueryTests(TestCase):
+
+    def test_slow_select_is_recorded_with_origin_and_plan(self):
+        staff = User.objects.create_user("admin@example.com", "+70000000002", "secret123", is_staff=True)
+        client = APIClient()
+        client.force_authenticate(staff)
+        with mock.patch.object(slow_queries, "record") as record:
+            self.assertEqual(client.get("/api/table/tables/").status_code, 200)
+
+        entry = record.call_args_list[0].args[0]
+        self.assertEqual(entry["origin"], "TableViewSet.list")
+        self.assertTrue(entry["sql"].startswith("SELECT"))
+        self.assertIn("actual time", entry["plan"])
+        self.assertIn("Buffers", entry["plan"])
+
+    def test_admin_page_lists_worst_queries(self):
+        staff = User.objects.create_superuser("admin@example.com", "+70000000002", "secret123")
+        self.client.force_login(staff)
+        entry = {"sql": "SELECT 1", "duration_ms": 512.0, "origin": "ReservationViewSet.list",
+                 "database": "default", "at": time.time(), "plan": "Result"}
+        with mock.patch.object(slow_queries, "worst", return_value=[entry]), \
+                mock.patch.object(slow_queries, "record"):
+            response = self.client.get("/admin/slow-queries/")
+        self.assertContains(response, "ReservationViewSet.list")
+        self.assertContains(response, "512.0")
+
+
+class StructuredLoggingTests(TestCase):
+
+    def test_request_id_reaches_response_and_task_headers(self):
+        response = self.client.get("/metrics", HTTP_X_REQUEST_ID="req-42")
+        self.assertEqual(response["X-Request-ID"], "req-42")
+        self.assertRegex(self.client.get("/metrics", HTTP_X_REQUEST_ID="bad id!")["X-Request-ID"], r"^[0-9a-f]{32}$")
+
+        token = log.request_id.set("req-42")
+        headers = {}
+        log.inject_request_id(headers=headers)
+        log.request_id.reset(token)
+        self.assertEqual(headers, {"request_id": "req-42"})
+
+        task = SimpleNamespace(request=SimpleNamespace(**headers))
+        log.bind_task_request_id(task_id="t1", task=task)
+        self.assertEqual(log.request_id.get(), "req-42")
+        log.unbind_task_request_id(task_id="t1")
+        self.assertIsNone(log.request_id.get())
+
+    def test_async_handler_writes_sampled_json_lines(self):
+        stream = io.StringIO()
+        handler = log.AsyncJsonHandler(stream=stream)
+        handler.addFilter(log.SamplingFilter({"django.db.backends": 0}))
+        handler.addFilter(log.RequestIdFilter())
+        logger = logging.getLogger("monitoring.tests.async")
+        logger.addHandler(handler)
+        logger.propagate = False
+        self.addCleanup(handler.close)
+        self.addCleanup(logger.removeHandler, handler)
+
+        token = log.request_id.set("req-7")
+        logger.warning("занят столик %s", 5)
+        log.request_id.reset(token)
+        sql = logging.LogRecord("django.db.backends", logging.DEBUG, __file__, 1, "SELECT 1", None, None)
+        handler.handle(sql)
+        handler.flush()
+
+        lines = [orjson.loads(line) for line in stream.getvalue().splitlines()]
+        self.assertEqual(len(lines), 1)
+        self.assertEqual(lines[0]["message"], "занят столик 5")
+        self.assertEqual(lines[0]["request_id"], "req-7")
@@ -0,0 +1,48 @@
+import hmac
+from datetime import datetime, timezone
+
+import redis
+from django.conf import settings
+from django.contrib import admin
+from django.http import HttpResponse, HttpResponseForbidden
+from django.shortcuts import redirect, render
+
+from . import metrics, slow_queries
+
+
+def metrics_view(request):
+    """
+    Метрики в текстовом формате Prometheus. Если задан METRICS_TOKEN — только
+    с ним; без токена endpoint открыт лишь при DEBUG.
+    """
+    token = settings.METRICS_TOKEN
+    if not token:
+        if not settings.DEBUG:
+            return HttpResponseForbidden()
+    elif not hmac.compare_digest(request.headers.get("Authorization", "").encode(), f"Bearer {token}".encode()):
+        return HttpResponseForbidden()
+    body, content_type = metrics.exposition()
+    return HttpResponse(body, content_type=content_type)
+
+
+def slow_queries_view(request):
+    """ Страница администратора с худшими запросами; POST очищает журнал. """
+    context = {
+        **admin.site.each_context(request),
+        "title": "Медленные запросы",
+        "threshold_ms": settings.SLOW_QUERY_THRESHOLD_MS,
+        "explain_percent": round(settings.SLOW_QUERY_EXPLAIN_RATE * 100),
+        "keep": settings.SLOW_QUERY_KEEP,
+        "entries": [],
+    }
+    try:
+        if request.method == "POST":
+            slow_queries.clear()
+            return redirect(request.path)
+        context["entries"] = [
+            {**entry, "at": datetime.fromtimestamp(entry["at"], tz=timezone.utc)}
+            for entry in slow_queries.worst()
+        ]
+    except redis.RedisError:
+        context["error"] = "Redis недоступен, журнал прочитать не удалось."
+    return render(request, "monitoring/slow_queries.html", context)
@@ -0,0 +1,28 @@
+from email.header import decode_header, make_header
+
+from django.core.management.base import BaseCommand
+
+from notifications.smtp_stub import LocalSMTPServer
+
+
+class Command(BaseCommand):
+    help = "Запускает локальную SMTP-заглушку и печатает принятые письма."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--host", default="127.0.0.1")
+        parser.add_argument("--port", type=int, default=1025)
+
+    def handle(self, *args, **options):
+        def show(sender, recipients, message):
+            subject = str(make_header(decode_header(message.get("Subject", ""))))
+            self.stdout.write(f"{sender} -> {', '.join(recipients)}: {subject}")
+
+        server = LocalSMTPServer(options["host"], options["port"], on_message=show)
+        self.stdout.write(
+            f"SMTP-заглушка слушает {options['host']}:{server.port}. "
+            f"Используйте EMAIL_HOST={options['host']} EMAIL_PORT={server.port} EMAIL_USE_TLS=False."
+        )
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,36 @@
+from django.db import models
+from django.utils import timezone
+
+
+class OutboxEmail(models.Model):
+    """
+    Письмо в исходящей очереди. Пишется в той же транзакции, что и бизнес-
+    изменение, и отправляется воркером drain_outbox пачками.
+    """
+    STATUS_CHOICES = [
+        ("pending", "Ожидает отправки"),
+        ("sending", "Отправляется"),
+        ("sent", "Отправлено"),
+        ("failed", "Не удалось отправить"),
+    ]
+
+    to = models.EmailField(verbose_name="Получатель")
+    subject = models.CharField(max_length=255, verbose_name="Тема")
+    body = models.TextField(verbose_name="Текст")
+    from_email = models.CharField(max_length=254, blank=True, verbose_name="Отправитель")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="pending", verbose_name="Статус")
+    attempts = models.PositiveSmallIntegerField(default=0, verbose_name="Попыток")
+    next_attempt_at = models.DateTimeField(default=timezone.now, verbose_name="Следующая попытка")
+    lease_until = models.DateTimeField(null=True, blank=True, verbose_name="Захвачено воркером до")
+    last_error = models.TextField(blank=True, verbose_name="Последняя ошибка")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Дата создания")
+    sent_at = models.DateTimeField(null=True, blank=True, verbose_name="Дата отправки")
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["next_attempt_at"], condition=models.Q(status="pending"), name="outbox_pending_idx"),
+            models.Index(fields=["lease_until"], condition=models.Q(status="sending"), name="outbox_sending_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} -> {self.to} ({self.status})"
@@ -0,0 +1,116 @@
+import logging
+from datetime import timedelta
+
+from celery import shared_task
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.db.models import Q
+from django.utils.timezone import now
+
+from .models import OutboxEmail
+
+logger = logging.getLogger(__name__)
+
+
+def backoff(attempts):
+    """ Экспоненциальная пауза перед повтором: 1, 2, 4 ... минут, не больше часа. """
+    return timedelta(minutes=min(2 ** (attempts - 1), 60))
+
+
+def schedule_retry(email, error):
+    """ Откладывает письмо с экспоненциальной паузой или помечает неотправляемым. """
+    email.attempts += 1
+    email.last_error = str(error)
+    if email.attempts >= settings.OUTBOX_MAX_ATTEMPTS:
+        email.status = "failed"
+    else:
+        email.next_attempt_at = now() + backoff(email.attempts)
+
+
+def claim_batch(batch_size):
+    """
+    Короткая транзакция: берёт до batch_size писем к отправке (SKIP LOCKED)
+    и помечает их sending до истечения аренды. Письма с истёкшей арендой
+    (воркер упал посреди отправки) берутся снова — такое письмо может
+    уйти дважды, но не потеряется.
+    """
+    current = now()
+    with transaction.atomic():
+        emails = list(
+            OutboxEmail.objects.select_for_update(skip_locked=True)
+            .filter(Q(status="pending", next_attempt_at__lte=current) | Q(status="sending", lease_until__lte=current))
+            .order_by("next_attempt_at")[:batch_size]
+        )
+        for email in emails:
+            email.status = "sending"
+            email.lease_until = current + timedelta(seconds=settings.OUTBOX_LEASE_SECONDS)
+        OutboxEmail.objects.bulk_update(emails, ["status", "lease_until"])
+    return emails
+
+
+def deliver(emails):
+    """ Отправляет письма через одно SMTP-соединение вне транзакции. Возвращает (отправлено, ошибок). """
+    sent = failed = 0
+    connection = get_connection(fail_silently=False)
+    try:
+        connection.open()
+    except Exception as exc:
+        # SMTP недоступен — переносим всю пачку
+        logger.warning("SMTP недоступен: %s", exc)
+        for email in emails:
+            email.status = "pending"
+            schedule_retry(email, exc)
+        return sent, len(emails)
+    try:
+        for email in emails:
+            message = EmailMessage(
+                email.subject, email.body,
+                email.from_email or settings.DEFAULT_FROM_EMAIL, [email.to],
+                connection=connection,
+            )
+            try:
+                connection.send_messages([message])
+            except Exception as exc:
+                failed += 1
+                email.status = "pending"
+                schedule_retry(email, exc)
+            else:
+                sent += 1
+                email.attempts += 1
+                email.status = "sent"
+                email.sent_at = now()
+    finally:
+        connection.close()
+    return sent, failed
+
+
+def send_batch(batch_size):
+    """
+    Отправляет одну пачку писем. Захват и запись результатов — две короткие
+    транзакции, SMTP между ними: медленный сервер не держит блокировки строк.
+    Возвращает (отправлено, ошибок).
+    """
+    emails = claim_batch(batch_size)
+    if not emails:
+        return 0, 0
+    sent, failed = deliver(emails)
+    for email in emails:
+        email.lease_until = None
+    OutboxEmail.objects.bulk_update(
+        emails, ["status", "attempts", "next_attempt_at", "last_error", "sent_at", "lease_until"]
+    )
+    return sent, failed
+
+
+@shared_task
+def drain_outbox():
+    """ Разбирает исходящую очередь пачками, пока есть письма к отправке. """
+    total_sent = total_failed = 0
+    while True:
+        sent, failed = send_batch(settings.OUTBOX_BATCH_SIZE)
+        total_sent += sent
+        total_failed += failed
+        if sent + failed < settings.OUTBOX_BATCH_SIZE:
+            break
+    return {"sent": total_sent, "failed": total_failed}
@@ -0,0 +1,85 @@
+import socket
+from datetime import timedelta
+from unittest import mock
+
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.utils.timezone import now
+
+from .models import OutboxEmail
+from .smtp_stub import LocalSMTPServer
+from .tasks import drain_outbox
+from .utils import enqueue_email
+
+SMTP_SETTINGS = {
+    "EMAIL_BACKEND": "django.core.mail.backends.smtp.EmailBackend",
+    "EMAIL_HOST": "127.0.0.1",
+    "EMAIL_USE_TLS": False,
+    "EMAIL_HOST_USER": "",
+    "EMAIL_HOST_PASSWORD": "",
+}
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class OutboxDrainTests(TestCase):
+
+    def test_batch_goes_over_one_connection(self):
+        for i in range(3):
+            enqueue_email(f"guest{i}@example.com", f"Тема {i}", "Текст")
+
+        with LocalSMTPServer() as smtp, override_settings(EMAIL_PORT=smtp.port, **SMTP_SETTINGS):
+            result = drain_outbox()
+
+        self.assertEqual(result, {"sent": 3, "failed": 0})
+        self.assertEqual(smtp.connections, 1)
+        self.assertEqual(sorted(to for _, (to,), _ in smtp.messages),
+                         ["guest0@example.com", "guest1@example.com", "guest2@example.com"])
+        self.assertFalse(OutboxEmail.objects.exclude(status="sent").exists())
+
+    def test_smtp_runs_outside_transaction_with_rows_leased(self):
+        enqueue_email("guest@example.com", "Тема", "Текст")
+        outer = len(connection.atomic_blocks)  # Транзакции самого TestCase
+        seen = []
+
+        def send_messages(messages):
+            seen.append((len(connection.atomic_blocks), list(OutboxEmail.objects.values_list("status", flat=True))))
+            return len(messages)
+
+        with override_settings(EMAIL_BACKEND="django.core.mail.backends.locmem.EmailBackend"), \
+                mock.patch("django.core.mail.backends.locmem.EmailBackend.send_messages", side_effect=send_messages):
+            self.assertEqual(drain_outbox(), {"sent": 1, "failed": 0})
+
+        self.assertEqual(seen, [(outer, ["sending"])])
+        self.assertEqual(OutboxEmail.objects.get().lease_until, None)
+
+    def test_expired_lease_is_taken_again(self):
+        email = enqueue_email("guest@example.com", "Тема", "Текст")
+        OutboxEmail.objects.filter(pk=email.pk).update(status="sending", lease_until=now() - timedelta(seconds=1))
+
+        with override_settings(EMAIL_BACKEND="django.core.mail.backends.locmem.EmailBackend"):
+            self.assertEqual(drain_outbox(), {"sent": 1, "failed": 0})
+
+    @override_settings(EMAIL_PORT=free_port(), **SMTP_SETTINGS)
+    def test_unavailable_smtp_schedules_retry(self):
+        email = enqueue_email("guest@example.com", "Тема", "Текст")
+
+        self.assertEqual(drain_outbox(), {"sent": 0, "failed": 1})
+
+        email.refresh_from_db()
+        self.assertEqual(email.status, "pending")
+        self.assertEqual(email.attempts, 1)
+        self.assertGreater(email.next_attempt_at, now())
+
+    @override_settings(EMAIL_PORT=free_port(), OUTBOX_MAX_ATTEMPTS=1, **SMTP_SETTINGS)
+    def test_gives_up_after_max_attempts(self):
+        email = enqueue_email("guest@example.com", "Тема", "Текст")
+
+        drain_outbox()
+
+        email.refresh_from_db()
+        self.assertEqual(email.status, "failed")
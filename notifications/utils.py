@@ -0,0 +1,31 @@
+from django.db import transaction
+
+from .models import OutboxEmail
+
+
+def enqueue_email(to_email, subject, message, from_email=""):
+    """
+    Кладёт письмо в исходящую очередь в текущей транзакции. SMTP на пути
+    запроса не трогаем: после коммита будим воркер, остальное — по расписанию.
+    """
+    email = OutboxEmail.objects.create(to=to_email, subject=subject, body=message, from_email=from_email)
+    transaction.on_commit(_wake_sender)
+    return email
+
+
+def enqueue_emails(emails):
+    """ Пакетный вариант enqueue_email: [(to, subject, message, from_email), ...] одним INSERT. """
+    if not emails:
+        return []
+    created = OutboxEmail.objects.bulk_create([
+        OutboxEmail(to=to_email, subject=subject, body=message, from_email=from_email)
+        for to_email, subject, message, from_email in emails
+    ])
+    transaction.on_commit(_wake_sender)
+    return created
+
+
+def _wake_sender():
+    from .tasks import drain_outbox
+
+    drain_outbox.delay()
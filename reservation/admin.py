@@ -11,6 +11,7 @@ class TableAdmin(admin.ModelAdmin):
 @admin.register(Reservation)
 class ReservationAdmin(admin.ModelAdmin):
     list_display = ("id", "user", "table", "date", "time", "status")
+    list_select_related = ("user", "table")
     list_filter = ("status", "date")
     search_fields = ("user__email", "table__number")
     ordering = ("date", "time")
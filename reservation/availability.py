@@ -0,0 +1,100 @@
+from bisect import bisect_left, insort
+from collections import defaultdict
+
+from tables import cache as table_cache
+from . import occupancy
+from .models import Reservation
+
+
+class IntervalIndex:
+    """
+    Индекс занятых интервалов по столикам.
+
+    Для каждого столика хранит отсортированные начала броней и префиксный
+    максимум их окончаний, поэтому проверка свободного окна — один bisect.
+    """
+
+    def __init__(self, intervals):
+        grouped = defaultdict(list)
+        for table_id, start, end in intervals:
+            grouped[table_id].append((start, end))
+
+        self._intervals = {}
+        self._starts = {}
+        self._max_ends = {}
+        for table_id, items in grouped.items():
+            items.sort()
+            self._intervals[table_id] = items
+            self._rebuild(table_id, 0)
+
+    def _rebuild(self, table_id, position):
+        """ Пересчитывает префиксный максимум окончаний начиная с position. """
+        items = self._intervals[table_id]
+        starts = self._starts.setdefault(table_id, [])
+        max_ends = self._max_ends.setdefault(table_id, [])
+        del starts[position:], max_ends[position:]
+        current_max = max_ends[-1] if max_ends else None
+        for start, end in items[position:]:
+            current_max = end if current_max is None else max(current_max, end)
+            starts.append(start)
+            max_ends.append(current_max)
+
+    @classmethod
+    def for_window(cls, start, end):
+        """
+        Строит индекс одним запросом по денормализованным границам броней,
+        пересекающих [start, end): окно берётся из самого запроса, поэтому
+        брони через полночь и длинные интервалы учитываются целиком.
+        """
+        rows = Reservation.objects.filter(
+            status__in=Reservation.ACTIVE_STATUSES,
+            start_at__lt=end,
+            end_at__gt=start,
+        ).values_list("table_id", "start_at", "end_at")
+        return cls(rows)
+
+    @classmethod
+    def for_tables(cls, table_ids, start, end):
+        """ Строит индекс одним запросом по набору столиков в окне [start, end). """
+        rows = Reservation.objects.filter(
+            table_id__in=table_ids,
+            status__in=Reservation.ACTIVE_STATUSES,
+            start_at__lt=end,
+            end_at__gt=start,
+        ).values_list("table_id", "start_at", "end_at")
+        return cls(rows)
+
+    def add(self, table_id, start, end):
+        """ Добавляет интервал, например только что принятую бронь пакета. """
+        items = self._intervals.setdefault(table_id, [])
+        insort(items, (start, end))
+        self._rebuild(table_id, items.index((start, end)))
+
+    def is_free(self, table_id, start, end):
+        """ Свободен ли столик на интервале [start, end). """
+        starts = self._starts.get(table_id)
+        if not starts:
+            return True
+        # Брони с началом раньше конца запрошенного окна — это starts[:i]
+        i = bisect_left(starts, end)
+        return i == 0 or self._max_ends[table_id][i - 1] <= start
+
+
+def find_available_tables(date, time, duration, guests):
+    """ Возвращает все свободные столики, вмещающие указанное число гостей. """
+    start, end = Reservation.bounds(date, time, duration)
+
+    # Каталог столиков — из кэша по версии, без запроса к БД
+    tables = sorted(
+        (table for table in table_cache.all_tables() if table.status == "available" and table.seats >= guests),
+        key=lambda table: (table.seats, table.number),
+    )
+
+    free = occupancy.free_tables([table.id for table in tables], start, end)
+    if free is None:
+        index = IntervalIndex.for_window(start, end)
+    else:
+        # Redis отвечает за свободные столики, остальные перепроверяем в БД
+        busy = [table.id for table in tables if table.id not in free]
+        index = IntervalIndex.for_tables(busy, start, end) if busy else IntervalIndex([])
+    return [table for table in tables if index.is_free(table.id, start, end)]
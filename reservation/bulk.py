@@ -0,0 +1,96 @@
+from django.conf import settings
+from django.db import transaction
+from rest_framework import serializers
+
+from tables.models import Table
+from . import counters, events, list_cache, occupancy
+from .availability import IntervalIndex
+from .models import Reservation
+from .serializers import OVERLAP_ERROR, overlap_guard
+from .utils import send_email
+
+MODE_ATOMIC = "atomic"
+MODE_BEST_EFFORT = "best_effort"
+
+
+def validate_batch(items):
+    """
+    Проверяет пакет за один проход: один запрос за столиками, один за
+    пересекающимися бронями, а пересечения внутри пакета — через индекс.
+    Возвращает (принятые брони, ошибки по индексам элементов).
+    """
+    tables = Table.objects.in_bulk({item["table"] for item in items})
+    bounds = [Reservation.bounds(item["date"], item["time"], item["duration"]) for item in items]
+    index = IntervalIndex.for_tables(
+        list(tables),
+        min(start for start, _ in bounds),
+        max(end for _, end in bounds),
+    )
+
+    accepted, errors = [], []
+    for position, (item, (start_at, end_at)) in enumerate(zip(items, bounds)):
+        table = tables.get(item["table"])
+        if table is None:
+            errors.append({"index": position, "error": "Столик не найден."})
+            continue
+        if not index.is_free(table.id, start_at, end_at):
+            errors.append({"index": position, "error": OVERLAP_ERROR})
+            continue
+
+        index.add(table.id, start_at, end_at)
+        accepted.append(Reservation(
+            table=table,
+            date=item["date"],
+            time=item["time"],
+            duration=item["duration"],
+            start_at=start_at,
+            end_at=end_at,
+        ))
+    return accepted, errors
+
+
+def notify_batch(user, reservations):
+    """ Одно письмо со всеми бронями пакета вместо письма на каждую. """
+    lines = [
+        f"Столик №{reservation.table.number} на {reservation.date} в {reservation.time}: "
+        f"{settings.SITE_URL}/api/reservation/reservations/confirm/{reservation.confirmation_token}/"
+        for reservation in reservations
+    ]
+    message = (
+        f"Здравствуйте, {user.email}!\n\n"
+        f"Вы забронировали {len(reservations)} столиков. Для подтверждения перейдите по ссылкам:\n"
+        + "\n".join(lines)
+        + "\n\nНеподтверждённые брони будут автоматически отменены за 15 минут до начала.\n"
+        "Спасибо за выбор нашего ресторана!"
+    )
+    send_email(user.email, "Подтвердите ваши бронирования", message)
+
+
+def create_batch(user, items, mode=MODE_ATOMIC):
+    """
+    Пакетное бронирование. В режиме atomic любая ошибка отменяет весь пакет,
+    в режиме best_effort создаются только прошедшие проверку брони.
+    Сигнал post_save не срабатывает: одно письмо через outbox в той же
+    транзакции, напоминания выполнит sweeper по next_action_at.
+    """
+    accepted, errors = validate_batch(items)
+    if errors and mode == MODE_ATOMIC:
+        raise serializers.ValidationError({"rejected": errors})
+
+    for reservation in accepted:
+        reservation.user = user
+        reservation.plan_next_action()  # bulk_create обходит save()
+
+    if accepted:
+        with overlap_guard():
+            created = Reservation.objects.bulk_create(accepted)
+            counters.add([user.id] * len(created))
+            list_cache.bump_on_commit([user.id])
+            notify_batch(user, created)
+        # bulk_create не шлёт post_save — занятость в Redis обновляем сами
+        changes = [(None, reservation.occupied_slot()) for reservation in created]
+        transaction.on_commit(lambda: occupancy.apply_changes(changes))
+        transaction.on_commit(lambda: events.publish(events.CREATED, changes))
+    else:
+        created = []
+    return created, errors
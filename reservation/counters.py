@@ -0,0 +1,70 @@
+"""
+Счётчик активных броней пользователя (users.User.active_reservations_count).
+Лимит проверяется условным UPDATE, а не COUNT по броням, поэтому два
+параллельных запроса одного пользователя не проходят оба. Расхождения
+(правка статуса в админке, ручные UPDATE) исправляет команда
+reconcile_reservation_counters.
+"""
+from collections import Counter
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+
+from users import authentication
+
+from .models import ACTIVE_STATUSES, Reservation
+
+MAX_ACTIVE_RESERVATIONS = 3
+LIMIT_ERROR = f"У вас уже есть {MAX_ACTIVE_RESERVATIONS} активных бронирования."
+
+
+def acquire(user):
+    """ +1 к счётчику, если лимит не исчерпан. False — лимит исчерпан. """
+    acquired = bool(get_user_model().objects.filter(
+        pk=user.pk, active_reservations_count__lt=MAX_ACTIVE_RESERVATIONS
+    ).update(active_reservations_count=F("active_reservations_count") + 1))
+    if acquired:
+        _forget([user.pk])
+    return acquired
+
+
+def add(user_ids):
+    """ Безусловно увеличивает счётчики (пакетное бронирование администратором). """
+    _shift(Counter(user_ids), 1)
+
+
+def release(user_ids):
+    """ Уменьшает счётчики: по одному на каждое вхождение user_id. """
+    _shift(Counter(user_ids), -1)
+
+
+def _shift(per_user, sign):
+    # Один UPDATE на каждое различное количество, обычно это один запрос
+    by_amount = {}
+    for user_id, amount in per_user.items():
+        by_amount.setdefault(amount, []).append(user_id)
+    for amount, user_ids in by_amount.items():
+        get_user_model().objects.filter(pk__in=user_ids).update(
+            active_reservations_count=Greatest(F("active_reservations_count") + sign * amount, Value(0))
+        )
+    _forget(per_user)
+
+
+def _forget(user_ids):
+    # UPDATE не шлёт post_save: пользователь из кэша аутентификации видел бы старый счётчик
+    user_ids = list(user_ids)
+    if user_ids:
+        transaction.on_commit(lambda: authentication.invalidate(user_ids))
+
+
+def reconcile():
+    """ Пересчитывает все счётчики по таблице броней. Возвращает число исправленных. """
+    actual = Coalesce(Subquery(
+        Reservation.objects.filter(user=OuterRef("pk"), status__in=ACTIVE_STATUSES)
+        .order_by().values("user").annotate(total=Count("id")).values("total")
+    ), 0)
+    return get_user_model().objects.annotate(actual=actual).filter(
+        ~Q(active_reservations_count=F("actual"))
+    ).update(active_reservations_count=actual)
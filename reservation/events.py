@@ -0,0 +1,73 @@
+"""
+События изменения слотов для подписчиков на дату (см. streams.py).
+Публикуются после коммита в канал Redis availability:<дата>, поэтому
+доходят до подписчиков на всех узлах.
+"""
+import json
+import logging
+
+import redis
+from django.conf import settings
+from django.utils.timezone import localtime
+
+logger = logging.getLogger(__name__)
+
+CREATED = "created"
+UPDATED = "updated"
+CANCELLED = "cancelled"
+CONFIRMED = "confirmed"
+AUTO_CANCELLED = "auto_cancelled"
+
+_client = None
+
+
+def get_client():
+    global _client
+    if _client is None:
+        _client = redis.Redis.from_url(
+            settings.AVAILABILITY_EVENTS_REDIS_URL, socket_timeout=0.2, socket_connect_timeout=0.2
+        )
+    return _client
+
+
+def enabled():
+    return getattr(settings, "AVAILABILITY_EVENTS_ENABLED", False)
+
+
+def channel(day):
+    return f"availability:{day.isoformat()}"
+
+
+def _slot(slot):
+    if not slot:
+        return None
+    table_id, start_at, end_at = slot
+    return {"table": table_id, "start": start_at.isoformat(), "end": end_at.isoformat()}
+
+
+def _days(slot):
+    """ Дни, которые задевает слот (бронь может переходить через полночь). """
+    if not slot:
+        return set()
+    _, start_at, end_at = slot
+    first, last = localtime(start_at).date(), localtime(end_at).date()
+    return {first, last}
+
+
+def publish(kind, changes):
+    """
+    Публикует пары (old_slot, new_slot) одного вида изменения: released —
+    освободившийся интервал, occupied — занятый. Для подтверждения оба
+    совпадают, и событие только меняет статус.
+    """
+    if not enabled() or not changes:
+        return
+    try:
+        pipe = get_client().pipeline(transaction=False)
+        for old_slot, new_slot in changes:
+            payload = json.dumps({"event": kind, "released": _slot(old_slot), "occupied": _slot(new_slot)})
+            for day in _days(old_slot) | _days(new_slot):
+                pipe.publish(channel(day), payload)
+        pipe.execute()
+    except redis.RedisError:
+        logger.warning("Не удалось опубликовать события доступности", exc_info=True)
@@ -0,0 +1,115 @@
+"""
+Кэш списка «мои брони». У каждого пользователя в Redis есть метка версии
+его броней, она меняется после коммита любого изменения (создание, перенос,
+отмена, подтверждение, автоотмена, пакетные операции). ETag ответа строится
+из метки, поэтому опрос без изменений — один GET в Redis и 304, а при
+изменениях готовый JSON страницы берётся из Redis по ключу с меткой.
+"""
+import hashlib
+import json
+import logging
+import time
+from datetime import timedelta
+
+import redis
+from django.conf import settings
+from django.db import transaction
+from rest_framework import status
+from rest_framework.response import Response
+
+logger = logging.getLogger(__name__)
+
+STAMP_TTL = timedelta(days=7)
+PAGE_TTL = timedelta(hours=1)
+
+_client = None
+
+
+def get_client():
+    global _client
+    if _client is None:
+        _client = redis.Redis.from_url(
+            settings.RESERVATION_LIST_CACHE_REDIS_URL, socket_timeout=0.2, socket_connect_timeout=0.2
+        )
+    return _client
+
+
+def enabled():
+    return getattr(settings, "RESERVATION_LIST_CACHE_ENABLED", False)
+
+
+def stamp_key(user_id):
+    return f"reservations:user:{user_id}:stamp"
+
+
+def page_key(user_id, stamp, name):
+    return f"reservations:user:{user_id}:{stamp}:{hashlib.sha1(name.encode()).hexdigest()}"
+
+
+def current_stamp(user_id):
+    """
+    Метка версии броней пользователя или None без Redis. Метка — время в
+    наносекундах, а не счётчик: после вытеснения ключа новая метка не
+    совпадёт со старым ETag клиента.
+    """
+    if not enabled():
+        return None
+    try:
+        client = get_client()
+        stamp = client.get(stamp_key(user_id))
+        if stamp is None:
+            client.set(stamp_key(user_id), time.time_ns(), ex=STAMP_TTL, nx=True)
+            stamp = client.get(stamp_key(user_id))
+        return stamp.decode() if isinstance(stamp, bytes) else str(stamp)
+    except redis.RedisError:
+        logger.warning("Redis недоступен, список броней без кэша", exc_info=True)
+        return None
+
+
+def bump(user_ids):
+    """ Новые метки для пользователей; старые страницы и ETag перестают совпадать. """
+    user_ids = set(user_ids)
+    if not enabled() or not user_ids:
+        return
+    try:
+        pipe = get_client().pipeline(transaction=False)
+        for user_id in user_ids:
+            pipe.set(stamp_key(user_id), time.time_ns(), ex=STAMP_TTL)
+        pipe.execute()
+    except redis.RedisError:
+        logger.warning("Не удалось обновить метки списков броней", exc_info=True)
+
+
+def bump_on_commit(user_ids):
+    """ Метки меняются только после коммита, иначе кэш успеет прочитать старые данные. """
+    user_ids = set(user_ids)
+    if user_ids:
+        transaction.on_commit(lambda: bump(user_ids))
+
+
+def conditional_response(request, build):
+    """ Страница списка пользователя с ETag; при совпадении If-None-Match — 304. """
+    user_id = request.user.pk
+    stamp = current_stamp(user_id)
+    if stamp is None:
+        return Response(build())
+
+    name = request.build_absolute_uri()
+    tag = f'"reservations-{user_id}-{stamp}-{hashlib.sha1(name.encode()).hexdigest()[:16]}"'
+    if request.headers.get("If-None-Match") == tag:
+        return Response(status=status.HTTP_304_NOT_MODIFIED, headers={"ETag": tag})
+
+    key = page_key(user_id, stamp, name)
+    try:
+        raw = get_client().get(key)
+    except redis.RedisError:
+        raw = None
+    if raw is not None:
+        return Response(json.loads(raw), headers={"ETag": tag})
+
+    data = build()
+    try:
+        get_client().set(key, json.dumps(data, default=str), ex=PAGE_TTL)
+    except redis.RedisError:
+        logger.warning("Не удалось сохранить список броней в Redis", exc_info=True)
+    return Response(data, headers={"ETag": tag})
@@ -0,0 +1,124 @@
+import threading
+import time
+from datetime import date, time as dt_time, timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import IntegrityError, connection, transaction
+from django.db.models.signals import post_save
+from rest_framework import serializers
+
+from reservation.models import Reservation
+from reservation.serializers import check_time_overlap
+from reservation.signals import reservation_created
+from tables.models import Table
+from users.models import User
+
+BENCH_TABLE_NUMBER = 999_999
+BENCH_EMAIL = "bench-concurrency@example.com"
+
+
+def book_with_exclusion(table, user, slot):
+    """ Вставка без блокировок: гонку разрешает exclusion-констрейнт. """
+    try:
+        with transaction.atomic():
+            check_time_overlap(table, *slot)
+            Reservation.objects.create(user=user, table=table, date=slot[0], time=slot[1], duration=slot[2])
+        return True
+    except (serializers.ValidationError, IntegrityError):
+        return False
+
+
+def book_with_select_for_update(table, user, slot):
+    """ Сериализация через блокировку строки столика на время проверки и вставки. """
+    try:
+        with transaction.atomic():
+            Table.objects.select_for_update().get(pk=table.pk)
+            check_time_overlap(table, *slot)
+            Reservation.objects.create(user=user, table=table, date=slot[0], time=slot[1], duration=slot[2])
+        return True
+    except (serializers.ValidationError, IntegrityError):
+        return False
+
+
+STRATEGIES = {
+    "exclusion": book_with_exclusion,
+    "select_for_update": book_with_select_for_update,
+}
+
+
+class Command(BaseCommand):
+    help = "Нагрузочный тест: N параллельных бронирований одного слота для разных стратегий."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=16, help="Параллельных запросов на слот.")
+        parser.add_argument("--rounds", type=int, default=20, help="Количество слотов (раундов).")
+        parser.add_argument("--strategy", choices=[*STRATEGIES, "all"], default="all")
+
+    def handle(self, *args, **options):
+        strategies = list(STRATEGIES) if options["strategy"] == "all" else [options["strategy"]]
+
+        # Меряем только путь БД: письма и задачи Celery здесь не нужны
+        post_save.disconnect(reservation_created, sender=Reservation)
+        table, _ = Table.objects.get_or_create(
+            number=BENCH_TABLE_NUMBER, defaults={"seats": 4, "type": "standard"}
+        )
+        user, _ = User.objects.get_or_create(email=BENCH_EMAIL, defaults={"phone": "bench-conc"})
+        try:
+            for name in strategies:
+                self.run_strategy(name, table, user, options["workers"], options["rounds"])
+        finally:
+            Reservation.objects.filter(table=table).delete()
+            table.delete()
+            user.delete()
+            post_save.connect(reservation_created, sender=Reservation)
+
+    def run_strategy(self, name, table, user, workers, rounds):
+        book = STRATEGIES[name]
+        base_date = date.today() + timedelta(days=365)
+        successes = conflicts = double_bookings = 0
+        latencies = []
+        lock = threading.Lock()
+
+        started = time.perf_counter()
+        for round_no in range(rounds):
+            slot = (base_date + timedelta(days=round_no), dt_time(19, 0), 120)
+            barrier = threading.Barrier(workers)
+
+            def worker():
+                try:
+                    barrier.wait()
+                    t0 = time.perf_counter()
+                    ok = book(table, user, slot)
+                    elapsed = time.perf_counter() - t0
+                    with lock:
+                        latencies.append(elapsed)
+                        nonlocal successes, conflicts
+                        if ok:
+                            successes += 1
+                        else:
+                            conflicts += 1
+                finally:
+                    connection.close()
+
+            threads = [threading.Thread(target=worker) for _ in range(workers)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+            booked = Reservation.objects.filter(
+                table=table, date=slot[0], status__in=Reservation.ACTIVE_STATUSES
+            ).count()
+            double_bookings += max(booked - 1, 0)
+        total = time.perf_counter() - started
+
+        attempts = workers * rounds
+        latencies.sort()
+        p50 = latencies[len(latencies) // 2] * 1000
+        p95 = latencies[int(len(latencies) * 0.95) - 1] * 1000
+        self.stdout.write(
+            f"{name}: {attempts} попыток за {total:.2f} с ({attempts / total:.1f} запр/с), "
+            f"успешно {successes}, конфликтов {conflicts}, двойных броней {double_bookings}, "
+            f"p50 {p50:.1f} мс, p95 {p95:.1f} мс"
+        )
+        Reservation.objects.filter(table=table).delete()
@@ -0,0 +1,69 @@
+import random
+import time
+
+import orjson
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+
+from reservation.models import Reservation
+from reservation.rows import ORJSONRenderer, compile_mapper
+from reservation.seed import seed
+from reservation.serializers import ReservationCreateSerializer
+from reservation.views import ReservationViewSet
+from tables.models import Table
+from tables.serializers import TableSerializer
+from tables.views import TableViewSet
+
+
+def best_of(repeat, func):
+    """ Лучшее время из repeat прогонов, мс, и результат последнего. """
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000, result
+
+
+class Command(BaseCommand):
+    help = (
+        "Сравнивает ModelSerializer + JSONRenderer с быстрым путём "
+        ".values() + скомпилированный маппер + orjson на N строках. "
+        "Данные засеваются в транзакции и откатываются."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=10_000)
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def handle(self, *args, **options):
+        rows, repeat = options["rows"], options["repeat"]
+        with transaction.atomic():
+            tables = 20
+            days = -(-rows // (tables * 6))  # 6 слотов в день на столик
+            seed(users=200, tables=tables, days=days, rng=random.Random(0))
+
+            reservations = Reservation.objects.order_by("id")[:rows]
+            table_rows = Table.objects.order_by("id")
+            cases = [
+                ("Reservation", reservations, ReservationCreateSerializer, ReservationViewSet.read_fields),
+                ("Table", table_rows, TableSerializer, TableViewSet.read_fields),
+            ]
+            for label, queryset, serializer_class, read_fields in cases:
+                self.compare(label, queryset, serializer_class, read_fields, repeat)
+            transaction.set_rollback(True)
+
+    def compare(self, label, queryset, serializer_class, read_fields, repeat):
+        map_row = compile_mapper(read_fields)
+        slow_ms, slow = best_of(repeat, lambda: JSONRenderer().render(
+            serializer_class(queryset.all(), many=True).data
+        ))
+        fast_ms, fast = best_of(repeat, lambda: ORJSONRenderer().render(
+            [map_row(row) for row in queryset.values(*(source for _, source in read_fields))]
+        ))
+        same = orjson.loads(slow) == orjson.loads(fast)
+        self.stdout.write(
+            f"{label}: {len(orjson.loads(fast))} строк — сериализатор {slow_ms:.1f} мс, "
+            f"быстрый путь {fast_ms:.1f} мс (x{slow_ms / fast_ms:.1f}), ответы совпадают: {same}"
+        )
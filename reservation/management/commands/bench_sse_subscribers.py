@@ -0,0 +1,124 @@
+import asyncio
+import json
+import time
+from datetime import date, time as dt_time, timedelta
+
+from django.core.asgi import get_asgi_application
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework_simplejwt.tokens import AccessToken
+
+from reservation import events
+from reservation.models import Reservation
+from users.models import User
+
+BENCH_EMAIL = "bench-sse@example.com"
+
+
+def rss_mb():
+    """ Текущий RSS процесса в МБ (Linux). """
+    with open("/proc/self/status") as status:
+        for line in status:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return float("nan")
+
+
+class Subscriber:
+    """ Один SSE-клиент, подключённый к ASGI-приложению напрямую, без HTTP-сервера. """
+
+    def __init__(self, app, path, query):
+        self.app = app
+        self.scope = {
+            "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+            "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": query.encode(),
+            "headers": [(b"host", b"testserver")], "client": ("127.0.0.1", 0), "server": ("testserver", 80),
+        }
+        self.ready = asyncio.Event()
+        self.disconnect = asyncio.Event()
+        self.received = {}
+        self.status = None
+        self._request_sent = False
+
+    async def receive(self):
+        if not self._request_sent:
+            self._request_sent = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await self.disconnect.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(self, message):
+        if message["type"] == "http.response.start":
+            self.status = message["status"]
+            if self.status != 200:
+                self.ready.set()
+            return
+        body = message.get("body", b"").decode()
+        if "event: ready" in body:
+            self.ready.set()
+        for block in body.split("\n\n"):
+            if block.startswith("event: slot"):
+                payload = json.loads(block.split("data: ", 1)[1])
+                self.received[payload["occupied"]["start"]] = time.perf_counter()
+
+    async def run(self):
+        await self.app(self.scope, self.receive, self.send)
+
+
+class Command(BaseCommand):
+    help = (
+        "Нагрузочный тест потока доступности: N простаивающих SSE-подписчиков в одном "
+        "процессе, память на подписчика и задержка доставки событий всем подписчикам. "
+        "Нужен запущенный Redis."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--subscribers", type=int, default=5000)
+        parser.add_argument("--events", type=int, default=20)
+
+    def handle(self, *args, **options):
+        if not events.enabled():
+            raise CommandError("AVAILABILITY_EVENTS_ENABLED выключен.")
+        user, _ = User.objects.get_or_create(email=BENCH_EMAIL, defaults={"phone": "bench-sse"})
+        token = str(AccessToken.for_user(user))
+        asyncio.run(self.bench(get_asgi_application(), token, options["subscribers"], options["events"]))
+
+    async def bench(self, app, token, count, event_count):
+        day = date.today() + timedelta(days=400)
+        query = f"date={day.isoformat()}&access_token={token}"
+        base_rss = rss_mb()
+
+        started = time.perf_counter()
+        subscribers = [Subscriber(app, "/api/reservation/availability/stream/", query) for _ in range(count)]
+        tasks = [asyncio.create_task(subscriber.run()) for subscriber in subscribers]
+        await asyncio.gather(*(subscriber.ready.wait() for subscriber in subscribers))
+        connect_seconds = time.perf_counter() - started
+        failed = sum(1 for subscriber in subscribers if subscriber.status != 200)
+        if failed:
+            raise CommandError(f"Не подключились: {failed} из {count}.")
+        await asyncio.sleep(0.5)  # PSUBSCRIBE должен успеть примениться
+        idle_rss = rss_mb()
+
+        latencies = []
+        for n in range(event_count):
+            start_at = Reservation.bounds(day, dt_time(12, 0), 0)[0] + timedelta(minutes=n)
+            published = time.perf_counter()
+            await asyncio.to_thread(events.publish, events.CREATED, [(None, (1, start_at, start_at + timedelta(hours=1)))])
+            key = start_at.isoformat()
+            while not all(key in subscriber.received for subscriber in subscribers):
+                await asyncio.sleep(0.005)
+            latencies.append(max(subscriber.received[key] for subscriber in subscribers) - published)
+
+        for subscriber in subscribers:
+            subscriber.disconnect.set()
+        await asyncio.wait(tasks, timeout=10)
+
+        latencies.sort()
+        self.stdout.write(f"Подписчиков: {count}, подключение: {connect_seconds:.2f} с")
+        self.stdout.write(
+            f"RSS: {base_rss:.0f} -> {idle_rss:.0f} МБ, "
+            f"~{(idle_rss - base_rss) * 1024 / count:.1f} КБ на подписчика"
+        )
+        self.stdout.write(
+            f"Доставка события всем подписчикам: p50 {latencies[len(latencies) // 2] * 1000:.1f} мс, "
+            f"max {latencies[-1] * 1000:.1f} мс"
+        )
@@ -0,0 +1,258 @@
+import json
+import logging
+import platform
+import random
+import statistics
+import subprocess
+import time
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import override_settings
+from django.utils.timezone import now
+from rest_framework.test import APIClient
+
+from monitoring.profiling import Profile
+from reservation import occupancy
+from reservation.celery import app
+from reservation.models import ACTION_REMINDER, ACTIVE_STATUSES, Reservation
+from reservation.seed import generate
+from reservation.tasks import sweep_reservation_actions
+from tables.models import Table
+from users.models import User
+
+logger = logging.getLogger(__name__)
+
+BENCH_EMAIL = "bench-suite-{}@example.com"
+API = "/api/reservation/reservations/"
+# Всё, что ходит в Redis; включается --with-redis
+REDIS_SETTINGS = (
+    "OCCUPANCY_ENABLED", "TABLE_CACHE_ENABLED", "RESERVATION_LIST_CACHE_ENABLED",
+    "AVAILABILITY_EVENTS_ENABLED", "AUTH_USER_CACHE_ENABLED",
+)
+
+
+def summary(timings, queries):
+    """ Статистика по длительностям операций (секунды) и числу SQL-запросов. """
+    ms = sorted(value * 1000 for value in timings)
+    return {
+        "ops": len(ms),
+        "mean_ms": round(statistics.fmean(ms), 3),
+        "p50_ms": round(statistics.median(ms), 3),
+        "p95_ms": round(ms[min(int(len(ms) * 0.95), len(ms) - 1)], 3),
+        "max_ms": round(ms[-1], 3),
+        "ops_per_sec": round(len(ms) / (sum(ms) / 1000), 1),
+        "queries_per_op": round(queries / len(ms), 2),
+    }
+
+
+@contextmanager
+def run_on_commit_hooks():
+    """
+    Выполняет on_commit-обработчики, поставленные внутри блока, сразу после
+    него: внешняя транзакция бенчмарка откатывается, и сами они не сработают.
+    Обработчики, поставленные обработчиками, выполняются тем же циклом.
+    """
+    start = len(connection.run_on_commit)
+    yield
+    while len(connection.run_on_commit) > start:
+        hooks = connection.run_on_commit[start:]
+        del connection.run_on_commit[start:]
+        for _, hook, robust in hooks:
+            if not robust:
+                hook()
+                continue
+            try:
+                hook()
+            except Exception:
+                logger.exception("Ошибка в on_commit-обработчике %s", hook)
+
+
+def measure(operations):
+    """
+    Выполняет операции по одной, меряя время и SQL-запросы каждой. Вся работа
+    идёт в откатываемой транзакции, поэтому on_commit-обработчики операции
+    (outbox, Redis, инвалидация кэшей) выполняются сразу после неё и входят в замер.
+    """
+    timings, queries = [], 0
+    for operation in operations:
+        profile = Profile()
+        with connection.execute_wrapper(profile.sql_wrapper):
+            started = time.perf_counter()
+            with run_on_commit_hooks():
+                operation()
+            timings.append(time.perf_counter() - started)
+        queries += profile.queries
+    return timings, queries
+
+
+def expect(response, code):
+    if response.status_code != code:
+        raise CommandError(f"{response.request['REQUEST_METHOD']} {response.request['PATH_INFO']}: "
+                           f"{response.status_code} вместо {code}: {response.content[:200]!r}")
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=settings.BASE_DIR,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        "Набор бенчмарков: создание, список, подтверждение и отмена брони через API "
+        "и sweeper напоминаний на сгенерированных данных (reservation.seed.generate). "
+        "Почта в памяти, Celery eager, Redis выключен (кроме --with-redis). Всё "
+        "выполняется в одной транзакции и откатывается; on_commit-обработчики каждой "
+        "операции выполняются сразу после неё и входят в замер. Результат — JSON "
+        "для сравнения между коммитами."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--tables", type=int, default=20)
+        parser.add_argument("--users", type=int, default=500)
+        parser.add_argument("--months", type=int, default=2)
+        parser.add_argument("--iterations", type=int, default=200, help="Операций в каждом сценарии.")
+        parser.add_argument("--sweep-rounds", type=int, default=5)
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument("--with-redis", action="store_true")
+        parser.add_argument("--output", help="Файл для JSON; по умолчанию stdout.")
+
+    def handle(self, *args, **options):
+        overrides = {
+            "EMAIL_BACKEND": "django.core.mail.backends.locmem.EmailBackend",
+            "CELERY_TASK_ALWAYS_EAGER": True,
+            "ALLOWED_HOSTS": [*settings.ALLOWED_HOSTS, "testserver"],
+        }
+        if not options["with_redis"]:
+            overrides.update(dict.fromkeys(REDIS_SETTINGS, False))
+
+        eager = app.conf.task_always_eager
+        app.conf.task_always_eager = True
+        try:
+            with override_settings(**overrides):
+                with transaction.atomic():
+                    result = self.run(options)
+                    transaction.set_rollback(True)
+                if options["with_redis"]:
+                    # Счётчики этих дней писали откаченные брони — пусть перестроятся из БД
+                    occupancy.invalidate_days(self.slots)
+        finally:
+            app.conf.task_always_eager = eager
+
+        output = json.dumps(result, ensure_ascii=False, indent=2)
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as file:
+                file.write(output + "\n")
+        else:
+            self.stdout.write(output)
+
+    def run(self, options):
+        rng = random.Random(options["seed"])
+        iterations = options["iterations"]
+        started = time.perf_counter()
+        generated = generate(tables=options["tables"], users=options["users"], months=options["months"], rng=rng)
+        generate_seconds = time.perf_counter() - started
+
+        tables = list(Table.objects.order_by("-id")[:options["tables"]])
+        users = User.objects.bulk_create([
+            User(email=BENCH_EMAIL.format(n), phone=f"bench-suite-{n}", password="!")
+            for n in range(iterations)
+        ])
+        clients = []
+        for user in users:
+            client = APIClient()
+            client.force_authenticate(user)
+            clients.append(client)
+        # Свои брони на дни после сгенерированных: у каждой операции свой столик и день
+        first_day = date.today() + timedelta(days=400)
+        payloads = [
+            {"table": tables[n % len(tables)].id, "date": str(first_day + timedelta(days=n // len(tables))),
+             "time": "12:00", "duration": 90}
+            for n in range(iterations)
+        ]
+        self.slots = [
+            (None, (payload["table"], *Reservation.bounds(
+                date.fromisoformat(payload["date"]), datetime.strptime(payload["time"], "%H:%M").time(),
+                payload["duration"],
+            )))
+            for payload in payloads
+        ]
+
+        cases = {}
+        created = []
+
+        def create(n):
+            response = clients[n].post(API, payloads[n], format="json")
+            expect(response, 201)
+            created.append(response.json()["id"])
+
+        cases["create"] = summary(*measure(lambda n=n: create(n) for n in range(iterations)))
+
+        heavy_user = User.objects.filter(email__startswith="seed-").order_by("id").first()
+        list_client = APIClient()
+        list_client.force_authenticate(heavy_user)
+        cases["list"] = summary(*measure(
+            lambda: expect(list_client.get(API), 200) for _ in range(iterations)
+        ))
+
+        tokens = dict(Reservation.objects.filter(id__in=created).values_list("id", "confirmation_token"))
+        anonymous = APIClient()
+        cases["confirm"] = summary(*measure(
+            lambda pk=pk: expect(anonymous.get(f"{API}confirm/{tokens[pk]}/"), 200) for pk in created
+        ))
+        cases["cancel"] = summary(*measure(
+            lambda n=n, pk=pk: expect(clients[n].post(f"{API}{pk}/cancel/"), 200) for n, pk in enumerate(created)
+        ))
+        cases["sweep_reminders"] = self.sweep(iterations, options["sweep_rounds"], rng)
+
+        return {
+            "meta": {
+                "commit": git_commit(),
+                "at": now().isoformat(),
+                "python": platform.python_version(),
+                "django": django.get_version(),
+                "postgres": connection.pg_version,
+                "redis": options["with_redis"],
+                "params": {key: options[key] for key in ("tables", "users", "months", "iterations", "sweep_rounds", "seed")},
+                "reservations_generated": generated,
+                "generate_seconds": round(generate_seconds, 2),
+            },
+            "cases": cases,
+        }
+
+    def sweep(self, batch, rounds, rng):
+        """
+        Каждый раунд делает batch будущих активных броней «просроченными» по
+        напоминанию и меряет один проход sweep_reservation_actions.
+        """
+        candidates = list(
+            Reservation.objects.filter(status__in=ACTIVE_STATUSES, start_at__gt=now() + timedelta(hours=2))
+            .exclude(user__email__startswith="bench-suite-").values_list("id", flat=True)
+        )
+        if len(candidates) < batch * rounds:
+            raise CommandError(f"Для sweeper нужно {batch * rounds} будущих броней, есть {len(candidates)}.")
+        rng.shuffle(candidates)
+        timings, queries, actions = [], 0, 0
+        for round_number in range(rounds):
+            ids = candidates[round_number * batch:(round_number + 1) * batch]
+            Reservation.objects.filter(id__in=ids).update(
+                next_action=ACTION_REMINDER, next_action_at=now() - timedelta(minutes=1)
+            )
+            done = {}
+            round_timings, round_queries = measure([lambda: done.update(sweep_reservation_actions.apply().get())])
+            timings += round_timings
+            queries += round_queries
+            actions += sum(done.values())
+        result = summary(timings, queries)
+        result["actions"] = actions
+        result["actions_per_sec"] = round(actions / sum(timings), 1)
+        return result
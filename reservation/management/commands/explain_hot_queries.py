@@ -0,0 +1,92 @@
+import random
+import re
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils.timezone import now
+
+from reservation.models import ACTIVE_STATUSES, Reservation
+from reservation.seed import seed
+from tables.models import Table
+from users.models import User
+
+# Индексы из миграций reservation 0007, tables 0002, users 0006: без них — «до»
+TUNED_INDEXES = (
+    "reservation_table_date_idx",
+    "reservation_user_keyset_idx",
+    "reservation_user_active_idx",
+    "reservation_pending_start_idx",
+    "user_verification_token_idx",
+    "user_reset_token_idx",
+    "table_type_seats_idx",
+)
+
+
+def hot_queries():
+    """ Запросы эндпоинтов с типичными параметрами из засеянных данных. """
+    user = User.objects.filter(email__startswith="seed-").order_by("?").first()
+    reservation = Reservation.objects.filter(user=user).first()
+    token_user = User.objects.exclude(verification_token=None).first()
+    reset_user = User.objects.exclude(reset_token=None).first()
+    current = now()
+    return {
+        "GET /api/reservation/reservations/ (мои брони)":
+            Reservation.objects.filter(user=user).order_by("date", "time", "id")[:50],
+        "GET /api/reservation/reservations/?table=&date=&status=":
+            Reservation.objects.filter(table_id=reservation.table_id, date=reservation.date, status="confirmed"),
+        "POST /api/reservation/reservations/ (лимит активных)":
+            Reservation.objects.filter(user=user, status__in=ACTIVE_STATUSES).values("id"),
+        "sweeper: пакетная автоотмена":
+            Reservation.objects.filter(status="pending", start_at__lte=current + timedelta(minutes=14),
+                                       end_at__gt=current),
+        "GET /api/user/users/verify-email/<token>/":
+            User.objects.filter(verification_token=token_user.verification_token if token_user else "-"),
+        "POST /api/user/users/reset-password/<token>/":
+            User.objects.filter(reset_token=reset_user.reset_token if reset_user else "-"),
+        "GET /api/table/tables/?type=&seats=":
+            Table.objects.filter(type="vip", seats=4),
+    }
+
+
+def execution_ms(plan):
+    match = re.search(r"Execution Time: ([\d.]+) ms", plan)
+    return float(match.group(1)) if match else float("nan")
+
+
+class Command(BaseCommand):
+    help = (
+        "Засевает синтетические данные и печатает EXPLAIN ANALYZE горячих запросов "
+        "без индексов из тюнинга и с ними. Только для dev/stage: «до» снимается "
+        "через DROP INDEX в откатываемой транзакции, что блокирует таблицы."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=5000)
+        parser.add_argument("--tables", type=int, default=60)
+        parser.add_argument("--days", type=int, default=180)
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument("--skip-seed", action="store_true", help="Использовать уже засеянные данные.")
+        parser.add_argument("--verbose-plans", action="store_true", help="Печатать планы целиком.")
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        if not options["skip_seed"]:
+            total = seed(options["users"], options["tables"], options["days"], rng)
+            self.stdout.write(f"Засеяно броней: {total}")
+
+        queries = hot_queries()
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                for name in TUNED_INDEXES:
+                    cursor.execute(f"DROP INDEX IF EXISTS {connection.ops.quote_name(name)}")
+            before = {label: qs.explain(analyze=True, buffers=True) for label, qs in queries.items()}
+            transaction.set_rollback(True)
+        after = {label: qs.explain(analyze=True, buffers=True) for label, qs in queries.items()}
+
+        for label in queries:
+            self.stdout.write(self.style.MIGRATE_HEADING(label))
+            for title, plans in (("до", before), ("после", after)):
+                plan = plans[label]
+                summary = plan if options["verbose_plans"] else plan.splitlines()[0]
+                self.stdout.write(f"  {title}: {execution_ms(plan):.3f} ms  {summary}")
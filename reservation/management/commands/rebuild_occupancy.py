@@ -0,0 +1,39 @@
+from datetime import date, datetime, timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils.timezone import make_aware
+
+from reservation import occupancy
+from reservation.models import Reservation
+from tables.models import Table
+
+
+class Command(BaseCommand):
+    help = (
+        "Перестраивает занятость столиков в Redis из БД. "
+        "Запускать по расписанию раз в сутки и после сбоя Redis."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--start", type=date.fromisoformat, default=None,
+                            help="Первый день (YYYY-MM-DD), по умолчанию вчера.")
+        parser.add_argument("--days", type=int, default=60, help="Сколько дней перестроить.")
+
+    def handle(self, *args, **options):
+        start = options["start"] or date.today() - timedelta(days=1)
+        table_ids = list(Table.objects.values_list("id", flat=True))
+
+        for offset in range(options["days"]):
+            day = start + timedelta(days=offset)
+            day_start = make_aware(datetime.combine(day, datetime.min.time()))
+            intervals = Reservation.objects.filter(
+                status__in=Reservation.ACTIVE_STATUSES,
+                start_at__lt=day_start + timedelta(days=1),
+                end_at__gt=day_start,
+            ).values_list("table_id", "start_at", "end_at")
+            # Каждая попытка читает БД заново (.all() — новый запрос)
+            occupancy.rebuild_day(day, table_ids, intervals.all)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Занятость перестроена: {options['days']} дн. с {start}, столиков: {len(table_ids)}."
+        ))
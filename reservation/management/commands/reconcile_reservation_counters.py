@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from reservation import counters
+
+
+class Command(BaseCommand):
+    help = (
+        "Пересчитывает счётчики активных броней пользователей по таблице броней. "
+        "Запускать по расписанию и после ручных правок статусов."
+    )
+
+    def handle(self, *args, **options):
+        fixed = counters.reconcile()
+        self.stdout.write(self.style.SUCCESS(f"Счётчики пересчитаны, исправлено: {fixed}."))
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:55
+
+import uuid
+
+from django.db import migrations, models
+
+
+def gen_confirmation_tokens(apps, schema_editor):
+    Reservation = apps.get_model("reservation", "Reservation")
+    for reservation in Reservation.objects.all():
+        reservation.confirmation_token = uuid.uuid4()
+        reservation.save(update_fields=["confirmation_token"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservation', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reservation',
+            name='confirmation_token',
+            field=models.UUIDField(default=uuid.uuid4, editable=False, null=True),
+        ),
+        migrations.RunPython(gen_confirmation_tokens, reverse_code=migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='reservation',
+            name='confirmation_token',
+            field=models.UUIDField(default=uuid.uuid4, editable=False, unique=True),
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:55
+
+from datetime import datetime, timedelta
+
+from django.db import migrations, models
+from django.utils.timezone import make_aware
+
+
+def fill_bounds(apps, schema_editor):
+    Reservation = apps.get_model("reservation", "Reservation")
+    batch = []
+    for reservation in Reservation.objects.only("date", "time", "duration").iterator(chunk_size=2000):
+        reservation.start_at = make_aware(datetime.combine(reservation.date, reservation.time))
+        reservation.end_at = reservation.start_at + timedelta(minutes=reservation.duration)
+        batch.append(reservation)
+        if len(batch) >= 2000:
+            Reservation.objects.bulk_update(batch, ["start_at", "end_at"])
+            batch = []
+    if batch:
+        Reservation.objects.bulk_update(batch, ["start_at", "end_at"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservation', '0002_reservation_confirmation_token'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reservation',
+            name='start_at',
+            field=models.DateTimeField(editable=False, null=True, verbose_name='Начало'),
+        ),
+        migrations.AddField(
+            model_name='reservation',
+            name='end_at',
+            field=models.DateTimeField(editable=False, null=True, verbose_name='Окончание'),
+        ),
+        migrations.RunPython(fill_bounds, reverse_code=migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='reservation',
+            name='start_at',
+            field=models.DateTimeField(editable=False, verbose_name='Начало'),
+        ),
+        migrations.AlterField(
+            model_name='reservation',
+            name='end_at',
+            field=models.DateTimeField(editable=False, verbose_name='Окончание'),
+        ),
+        migrations.AddIndex(
+            model_name='reservation',
+            index=models.Index(fields=['table', 'status', 'start_at', 'end_at'], name='reservation_table_slot_idx'),
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:56
+
+import django.contrib.postgres.constraints
+import django.contrib.postgres.fields.ranges
+import reservation.models
+from django.contrib.postgres.operations import BtreeGistExtension
+from django.db import migrations, models
+from django.db.models import Exists, OuterRef
+
+ACTIVE_STATUSES = ("pending", "confirmed")
+
+
+def cancel_overlaps(apps, schema_editor):
+    """
+    Старая проверка пропускала гонки и брони через полночь, поэтому в базе
+    могут быть пересекающиеся активные брони — с ними ограничение не создать.
+    На каждом столике оставляем подтверждённые, затем более ранние (по id),
+    остальные пересекающиеся отменяем. Письма не отправляются: список
+    отменённых id выводится, чтобы связаться с гостями.
+    """
+    Reservation = apps.get_model("reservation", "Reservation")
+    others = Reservation.objects.filter(
+        table_id=OuterRef("table_id"), status__in=ACTIVE_STATUSES,
+        start_at__lt=OuterRef("end_at"), end_at__gt=OuterRef("start_at"),
+    ).exclude(pk=OuterRef("pk"))
+    conflicting = (
+        Reservation.objects.filter(Exists(others), status__in=ACTIVE_STATUSES)
+        .values_list("id", "table_id", "status", "start_at", "end_at")
+    )
+    kept, cancelled = {}, []
+    for pk, table_id, status, start_at, end_at in sorted(conflicting, key=lambda r: (r[1], r[2] != "confirmed", r[0])):
+        table_kept = kept.setdefault(table_id, [])
+        if any(start < end_at and end > start_at for start, end in table_kept):
+            cancelled.append(pk)
+        else:
+            table_kept.append((start_at, end_at))
+    if cancelled:
+        Reservation.objects.filter(pk__in=cancelled).update(status="cancelled")
+        print(f"\n  Отменены пересекающиеся брони ({len(cancelled)}): {cancelled}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservation', '0003_reservation_start_at_end_at'),
+    ]
+
+    operations = [
+        BtreeGistExtension(),
+        migrations.RunPython(cancel_overlaps, reverse_code=migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='reservation',
+            constraint=django.contrib.postgres.constraints.ExclusionConstraint(condition=models.Q(('status__in', ('pending', 'confirmed'))), expressions=[('table', '='), (reservation.models.TsTzRange('start_at', 'end_at', django.contrib.postgres.fields.ranges.RangeBoundary()), '&&')], name='reservation_no_overlap'),
+        ),
+    ]
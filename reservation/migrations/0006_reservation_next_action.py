@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:05
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+# Брони, созданные до этой миграции, не планируются: у каждой уже стоят в
+# брокере ETA-задачи send_email_notification/auto_cancel_reservation от
+# старого schedule_reminders, и sweeper продублировал бы напоминания и
+# отмену. Эти брони досылаются старыми задачами (см. README, «Обновление»).
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservation', '0005_reservation_keyset_idx'),
+        ('tables', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reservation',
+            name='next_action',
+            field=models.CharField(blank=True, choices=[('reminder', 'Напоминание за час'), ('confirm_request', 'Запрос подтверждения'), ('auto_cancel', 'Автоотмена')], editable=False, max_length=20, null=True, verbose_name='Следующее действие'),
+        ),
+        migrations.AddField(
+            model_name='reservation',
+            name='next_action_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Время действия'),
+        ),
+        migrations.AddIndex(
+            model_name='reservation',
+            index=models.Index(condition=models.Q(('next_action_at__isnull', False)), fields=['next_action_at'], name='reservation_next_action_idx'),
+        ),
+    ]
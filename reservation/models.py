@@ -1,15 +1,49 @@
 import uuid
+from datetime import datetime, timedelta
 
+from django.contrib.postgres.constraints import ExclusionConstraint
+from django.contrib.postgres.fields import DateTimeRangeField, RangeBoundary, RangeOperators
 from django.db import models
 from django.conf import settings
+from django.utils.timezone import make_aware, now
 from tables.models import Table
 
+ACTIVE_STATUSES = ("pending", "confirmed")
+
+ACTION_REMINDER = "reminder"
+ACTION_CONFIRM_REQUEST = "confirm_request"
+ACTION_AUTO_CANCEL = "auto_cancel"
+
+# Неподтверждённая бронь отменяется за столько до начала
+AUTO_CANCEL_LEAD = timedelta(minutes=14)
+
+# Расписание действий по брони: (действие, за сколько до начала, для каких статусов)
+ACTION_SCHEDULE = (
+    (ACTION_REMINDER, timedelta(hours=1), ACTIVE_STATUSES),
+    (ACTION_CONFIRM_REQUEST, timedelta(minutes=15), ("pending",)),
+    (ACTION_AUTO_CANCEL, AUTO_CANCEL_LEAD, ("pending",)),
+)
+
+
+class TsTzRange(models.Func):
+    """ tstzrange(start, end, '[)') для exclusion-констрейнта. """
+    function = "TSTZRANGE"
+    output_field = DateTimeRangeField()
+
+
 class Reservation(models.Model):
     STATUS_CHOICES = [
         ("pending", "Ожидает подтверждения"),
         ("confirmed", "Подтверждено"),
         ("cancelled", "Отменено"),
     ]
+    ACTION_CHOICES = [
+        (ACTION_REMINDER, "Напоминание за час"),
+        (ACTION_CONFIRM_REQUEST, "Запрос подтверждения"),
+        (ACTION_AUTO_CANCEL, "Автоотмена"),
+    ]
+    ACTIVE_STATUSES = ACTIVE_STATUSES
+    OVERLAP_CONSTRAINT = "reservation_no_overlap"
 
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, verbose_name="Пользователь")
     table = models.ForeignKey(Table, on_delete=models.CASCADE, verbose_name="Столик")
@@ -18,8 +52,124 @@ class Reservation(models.Model):
     duration = models.PositiveIntegerField(verbose_name="Длительность (минуты)")
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="pending", verbose_name="Статус")
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Дата создания")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Дата изменения")
     confirmation_token = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
+    start_at = models.DateTimeField(editable=False, verbose_name="Начало")
+    end_at = models.DateTimeField(editable=False, verbose_name="Окончание")
+    next_action = models.CharField(max_length=20, choices=ACTION_CHOICES, null=True, blank=True,
+                                   editable=False, verbose_name="Следующее действие")
+    next_action_at = models.DateTimeField(null=True, blank=True, editable=False, verbose_name="Время действия")
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["table", "status", "start_at", "end_at"], name="reservation_table_slot_idx"),
+            models.Index(fields=["date", "time", "id"], name="reservation_keyset_idx"),
+            models.Index(fields=["next_action_at"], condition=models.Q(next_action_at__isnull=False),
+                         name="reservation_next_action_idx"),
+            # Фильтр админки/ReservationFilter: столик + дата + статус
+            models.Index(fields=["table", "date", "status"], name="reservation_table_date_idx"),
+            # Список «мои брони» в порядке keyset-пагинации
+            models.Index(fields=["user", "date", "time", "id"], name="reservation_user_keyset_idx"),
+            # Лимит и пересчёт счётчика: только активные брони пользователя
+            models.Index(fields=["user", "status"], condition=models.Q(status__in=ACTIVE_STATUSES),
+                         name="reservation_user_active_idx"),
+            # Пакетная автоотмена: неподтверждённые брони по времени начала
+            models.Index(fields=["start_at"], condition=models.Q(status="pending"),
+                         name="reservation_pending_start_idx"),
+            # Дельта-синхронизация: изменения пользователя после курсора
+            models.Index(fields=["user", "updated_at"], name="reservation_user_updated_idx"),
+        ]
+        constraints = [
+            # Гарантия БД: активные брони одного столика не пересекаются (требует btree_gist)
+            ExclusionConstraint(
+                name="reservation_no_overlap",
+                expressions=[
+                    ("table", RangeOperators.EQUAL),
+                    (TsTzRange("start_at", "end_at", RangeBoundary()), RangeOperators.OVERLAPS),
+                ],
+                condition=models.Q(status__in=ACTIVE_STATUSES),
+            ),
+        ]
 
     def __str__(self):
         return f"Бронирование {self.table.number} для {self.user.email} на {self.date} {self.time}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """
+        Запоминаем занятый слот (что освобождать в Redis) и то, для какого
+        статуса и начала запланировано следующее действие.
+        """
+        instance = super().from_db(db, field_names, values)
+        if {"table_id", "status", "start_at", "end_at"} <= instance.__dict__.keys():
+            instance._occupied_slot = instance.occupied_slot()
+            instance._planned_for = (instance.status, instance.start_at)
+        return instance
+
+    def occupied_slot(self):
+        """ (table_id, start_at, end_at) для активной брони, иначе None. """
+        if self.status in ACTIVE_STATUSES:
+            return self.table_id, self.start_at, self.end_at
+        return None
+
+    def plan_next_action(self, after=None):
+        """
+        Выставляет next_action/next_action_at. После выполненного действия
+        after берётся следующее по расписанию, даже если его время уже прошло
+        (sweeper мог опоздать). При новом планировании — первое ещё не
+        наступившее; автоотмену без отправленного запроса не планируем.
+        """
+        stages = ACTION_SCHEDULE
+        if after:
+            stages = stages[[action for action, _, _ in stages].index(after) + 1:]
+        current = now()
+        for action, lead, statuses in stages:
+            at = self.start_at - lead
+            if self.status not in statuses or (not after and at <= current):
+                continue
+            if not after and action == ACTION_AUTO_CANCEL:
+                break
+            self.next_action, self.next_action_at = action, at
+            return
+        self.next_action = self.next_action_at = None
+
+    @staticmethod
+    def bounds(date, time, duration):
+        """ Начало и конец брони как aware datetime. """
+        start_at = make_aware(datetime.combine(date, time))
+        return start_at, start_at + timedelta(minutes=duration)
+
+    def save(self, *args, **kwargs):
+        """
+        Пересчитываем денормализованные границы и, если изменились статус
+        или начало, перепланируем следующее действие. updated_at обновляется
+        и при save(update_fields=...) — на нём держится дельта-синхронизация.
+        """
+        self.start_at, self.end_at = self.bounds(self.date, self.time, self.duration)
+        extra_fields = {"updated_at"}
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and {"date", "time", "duration"} & set(update_fields):
+            extra_fields |= {"start_at", "end_at"}
+        if getattr(self, "_planned_for", None) != (self.status, self.start_at):
+            self.plan_next_action()
+            extra_fields |= {"next_action", "next_action_at"}
+        if update_fields is not None:
+            kwargs["update_fields"] = {*update_fields, *extra_fields}
+        super().save(*args, **kwargs)
+        self._planned_for = (self.status, self.start_at)
+
+
+class ReservationTombstone(models.Model):
+    """
+    Метка удалённой брони для дельта-синхронизации. user_id без внешнего
+    ключа: метка должна пережить каскадное удаление пользователя.
+    """
+    reservation_id = models.BigIntegerField(verbose_name="Бронь")
+    user_id = models.BigIntegerField(verbose_name="Пользователь")
+    deleted_at = models.DateTimeField(auto_now_add=True, verbose_name="Дата удаления")
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["user_id", "deleted_at"], name="tombstone_user_deleted_idx"),
+            models.Index(fields=["deleted_at"], name="tombstone_deleted_idx"),
+        ]
@@ -0,0 +1,191 @@
+"""
+Занятость столиков в Redis: по ключу на столик и день, один байт-счётчик
+(BITFIELD u8) на 5-минутный слот. Интервалы округляются наружу, поэтому
+«свободно» от Redis точно, а «занято» нужно подтверждать запросом в БД.
+Если Redis недоступен или день ещё не построен командой rebuild_occupancy,
+функции возвращают None и вызывающий код идёт в SQL.
+"""
+import logging
+import math
+from datetime import datetime, time, timedelta
+
+import redis
+from django.conf import settings
+from django.utils.timezone import localtime, make_aware
+
+logger = logging.getLogger(__name__)
+
+SLOT_MINUTES = 5
+SLOTS_PER_DAY = 24 * 60 // SLOT_MINUTES
+KEY_TTL = timedelta(days=2)
+
+_client = None
+
+
+def get_client():
+    """ Общий клиент Redis процесса (тот же Redis, что и брокер Celery). """
+    global _client
+    if _client is None:
+        _client = redis.Redis.from_url(
+            settings.OCCUPANCY_REDIS_URL, socket_timeout=0.2, socket_connect_timeout=0.2
+        )
+    return _client
+
+
+def enabled():
+    return getattr(settings, "OCCUPANCY_ENABLED", False)
+
+
+def day_key(table_id, day):
+    return f"occupancy:{table_id}:{day.isoformat()}"
+
+
+def ready_key(day):
+    return f"occupancy:ready:{day.isoformat()}"
+
+
+def _expire_at(day):
+    return make_aware(datetime.combine(day + timedelta(days=1), time.min)) + KEY_TTL
+
+
+def split_slots(start_at, end_at):
+    """
+    Разбивает интервал на части по дням: [(день, первый слот, последний слот)].
+    Границы округляются наружу до 5 минут.
+    """
+    start = localtime(start_at).replace(tzinfo=None)
+    end = localtime(end_at).replace(tzinfo=None)
+    parts = []
+    day = start.date()
+    while datetime.combine(day, time.min) < end:
+        day_start = datetime.combine(day, time.min)
+        seg_start = max(start, day_start)
+        seg_end = min(end, day_start + timedelta(days=1))
+        first = int((seg_start - day_start).total_seconds() // 60) // SLOT_MINUTES
+        last = math.ceil((seg_end - day_start).total_seconds() / 60 / SLOT_MINUTES) - 1
+        parts.append((day, first, last))
+        day += timedelta(days=1)
+    return parts
+
+
+def _bump(pipe, table_id, day, first, last, delta):
+    """ Прибавляет delta к счётчикам слотов first..last одной командой BITFIELD. """
+    key = day_key(table_id, day)
+    bitfield = pipe.bitfield(key).overflow("SAT")
+    for slot in range(first, last + 1):
+        bitfield.incrby("u8", f"#{slot}", delta)
+    bitfield.execute()
+    pipe.expireat(key, _expire_at(day))
+
+
+def _increment(pipe, table_id, start_at, end_at, delta):
+    for day, first, last in split_slots(start_at, end_at):
+        _bump(pipe, table_id, day, first, last, delta)
+
+
+def apply_change(old_slot, new_slot):
+    """
+    Переносит занятость из old_slot в new_slot.
+    Слот — (table_id, start_at, end_at) активной брони или None.
+    """
+    apply_changes([(old_slot, new_slot)])
+
+
+def apply_changes(changes):
+    """ Применяет пары (old_slot, new_slot) одной транзакцией MULTI/EXEC. """
+    changes = [(old, new) for old, new in changes if old != new]
+    if not enabled() or not changes:
+        return
+    try:
+        pipe = get_client().pipeline(transaction=True)
+        for old_slot, new_slot in changes:
+            if old_slot:
+                _increment(pipe, *old_slot, -1)
+            if new_slot:
+                _increment(pipe, *new_slot, 1)
+        pipe.execute()
+    except redis.RedisError:
+        logger.warning("Не удалось обновить занятость в Redis", exc_info=True)
+        invalidate_days(changes)
+
+
+def invalidate_days(changes):
+    """
+    Снимает отметку готовности с дней, затронутых changes: счётчики этих
+    дней могли разойтись с БД, и до rebuild_occupancy чтения идут в SQL.
+    """
+    days = {
+        day
+        for pair in changes
+        for slot in pair if slot
+        for day, _, _ in split_slots(slot[1], slot[2])
+    }
+    try:
+        get_client().delete(*(ready_key(day) for day in days))
+    except redis.RedisError:
+        logger.warning("Не удалось снять отметку готовности дней %s", sorted(days), exc_info=True)
+
+
+def free_tables(table_ids, start_at, end_at):
+    """
+    Возвращает множество столиков, свободных по данным Redis,
+    или None, если Redis недоступен или нужные дни не построены.
+    """
+    if not enabled():
+        return None
+    table_ids = list(table_ids)
+    parts = split_slots(start_at, end_at)
+    try:
+        pipe = get_client().pipeline(transaction=False)
+        for day, _, _ in parts:
+            pipe.exists(ready_key(day))
+        for table_id in table_ids:
+            for day, first, last in parts:
+                pipe.bitcount(day_key(table_id, day), first, last)
+        results = pipe.execute()
+    except redis.RedisError:
+        logger.warning("Redis недоступен, проверка занятости через БД", exc_info=True)
+        return None
+
+    if not all(results[:len(parts)]):
+        return None
+    counts = results[len(parts):]
+    return {
+        table_id
+        for position, table_id in enumerate(table_ids)
+        if not any(counts[position * len(parts):(position + 1) * len(parts)])
+    }
+
+
+def is_free(table_id, start_at, end_at):
+    """ True — точно свободно, False — возможно занято, None — нет данных. """
+    free = free_tables([table_id], start_at, end_at)
+    if free is None:
+        return None
+    return table_id in free
+
+
+def rebuild_day(day, table_ids, load_intervals):
+    """
+    Перестраивает ключи дня из БД: load_intervals() возвращает
+    (table_id, start_at, end_at) активных броней, пересекающих день.
+    Ключи дня под WATCH с момента до чтения БД: если apply_changes или
+    invalidate_days тронули их до EXEC, запись отменяется и день читается
+    заново — иначе перезапись стёрла бы бронь, закоммиченную после чтения.
+    Отмечает день как готовый.
+    """
+    keys = [day_key(table_id, day) for table_id in table_ids]
+
+    def rebuild(pipe):
+        intervals = list(load_intervals())
+        pipe.multi()
+        for key in keys:
+            pipe.delete(key)
+        for table_id, start_at, end_at in intervals:
+            for part_day, first, last in split_slots(start_at, end_at):
+                if part_day == day:
+                    _bump(pipe, table_id, day, first, last, 1)
+        pipe.set(ready_key(day), 1)
+        pipe.expireat(ready_key(day), _expire_at(day))
+
+    get_client().transaction(rebuild, ready_key(day), *keys)
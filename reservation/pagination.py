@@ -0,0 +1,123 @@
+import base64
+import json
+
+from django.core.exceptions import ValidationError
+from django.db import connections, models
+from django.db.models import Func, Value
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class Row(Func):
+    """ Конструктор строки PostgreSQL: ROW(a, b, c) сравнивается целиком по индексу. """
+    function = "ROW"
+    output_field = models.Field()
+
+
+def estimate_count(queryset):
+    """ Оценка числа строк из плана PostgreSQL вместо полного COUNT(*). """
+    sql, params = queryset.order_by().query.sql_with_params()
+    with connections[queryset.db].cursor() as cursor:
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+class KeysetPagination(BasePagination):
+    """
+    Курсорная (keyset) пагинация по уникальному составному ключу ordering.
+    Страница — это WHERE ROW(...) > ROW(курсор) ORDER BY ... LIMIT, поэтому
+    время ответа не зависит от глубины. ?count=estimate добавляет оценку
+    общего числа строк по плану запроса.
+    """
+    ordering = ("id",)
+    page_size = 50
+    max_page_size = 500
+    page_size_query_param = "page_size"
+    cursor_query_param = "cursor"
+    count_query_param = "count"
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except ValueError:
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def encode_cursor(self, reverse, obj):
+        # Строка из .values() (быстрый путь чтения) или экземпляр модели
+        values = [str(obj[field] if isinstance(obj, dict) else getattr(obj, field)) for field in self.ordering]
+        raw = json.dumps([reverse, values]).encode()
+        return replace_query_param(self.base_url, self.cursor_query_param, base64.urlsafe_b64encode(raw).decode())
+
+    def decode_cursor(self, request, model):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return False, None
+        try:
+            reverse, values = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+            values = [
+                model._meta.get_field(field).to_python(value)
+                for field, value in zip(self.ordering, values, strict=True)
+            ]
+        except (ValueError, TypeError, ValidationError):
+            raise NotFound("Неверный курсор.")
+        return bool(reverse), values
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.base_url = request.build_absolute_uri()
+        self.estimated_count = None
+        if request.query_params.get(self.count_query_param) == "estimate":
+            self.estimated_count = estimate_count(queryset)
+
+        page_size = self.get_page_size(request)
+        reverse, values = self.decode_cursor(request, queryset.model)
+
+        queryset = queryset.order_by(*(f"-{field}" if reverse else field for field in self.ordering))
+        if values is not None:
+            lookup = "_keyset__lt" if reverse else "_keyset__gt"
+            queryset = queryset.alias(_keyset=Row(*self.ordering)).filter(
+                **{lookup: Row(*(Value(value) for value in values))}
+            )
+
+        rows = list(queryset[:page_size + 1])
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        if reverse:
+            rows.reverse()
+
+        # Вперёд есть страницы, если их нашли или если мы пришли назад с курсором
+        self.has_next = has_more if not reverse else True
+        self.has_previous = values is not None if not reverse else has_more
+        self.page = rows
+        return rows
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(False, self.page[-1])
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(True, self.page[0])
+
+    def get_paginated_response(self, data):
+        payload = {
+            "next": self.get_next_link(),
+            "previous": self.get_previous_link(),
+            "results": data,
+        }
+        if self.estimated_count is not None:
+            payload = {"count": self.estimated_count, **payload}
+        return Response(payload)
+
+
+class ReservationPagination(KeysetPagination):
+    ordering = ("date", "time", "id")
@@ -0,0 +1,139 @@
+"""
+Быстрый путь чтения для списков: строки берутся через .values(), ответ
+собирается заранее подготовленной функцией вместо ModelSerializer и
+рендерится orjson. Формат полей тот же, что у сериализаторов: orjson пишет
+date/time/datetime/UUID в ISO, как DRF, а UTC — с суффиксом Z (OPT_UTC_Z).
+
+?fields=a,b сужает SELECT до нужных колонок, ?expand=table,user добавляет
+вложенные объекты через JOIN в том же запросе — .values() по связанным
+полям делает то же, что only() и select_related() для моделей.
+"""
+from functools import lru_cache
+from operator import itemgetter
+
+import orjson
+from django.http import Http404
+from django.utils.functional import Promise
+from rest_framework.exceptions import ValidationError
+from rest_framework.renderers import BaseRenderer
+
+from monitoring import profiling
+
+
+def sources(pairs):
+    """ Все поля ORM из pairs, включая вложенные. """
+    for _, src in pairs:
+        if isinstance(src, tuple):
+            yield from sources(src)
+        else:
+            yield src
+
+
+@lru_cache(maxsize=128)
+def compile_mapper(pairs):
+    """
+    pairs — ((ключ ответа, ключ строки .values() или вложенные pairs), ...).
+    Возвращает функцию строка -> dict. Разбор pairs делается один раз:
+    на строку остаётся только вызов заранее собранных itemgetter.
+    """
+    steps = tuple(
+        (out, compile_mapper(src) if isinstance(src, tuple) else itemgetter(src))
+        for out, src in pairs
+    )
+
+    def map_row(row):
+        return {out: get(row) for out, get in steps}
+    return map_row
+
+
+def _default(value):
+    if isinstance(value, Promise):
+        return str(value)
+    raise TypeError
+
+
+class ORJSONRenderer(BaseRenderer):
+    media_type = "application/json"
+    format = "json"
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        # Ключи-числа (легенда карты зала) — строками, как у json.dumps в DRF; UTC как «Z», как у DateTimeField
+        return orjson.dumps(data, default=_default, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_UTC_Z)
+
+
+def _names(value):
+    return [name.strip() for name in value.split(",") if name.strip()]
+
+
+class ValuesReadMixin:
+    """
+    list/retrieve без сериализатора. read_fields — поля ответа по умолчанию
+    ((ключ ответа, поле ORM), ...), optional_read_fields — доступные только
+    через ?fields=, expandable_fields — вложенные объекты для ?expand=.
+    """
+    read_fields = ()
+    optional_read_fields = ()
+    expandable_fields = {}
+    fields_query_param = "fields"
+    expand_query_param = "expand"
+
+    def get_read_fields(self):
+        params = self.request.query_params
+        fields = self.read_fields
+        if params.get(self.fields_query_param):
+            available = dict(self.read_fields + self.optional_read_fields)
+            names = _names(params[self.fields_query_param])
+            unknown = [name for name in names if name not in available]
+            if unknown:
+                raise ValidationError({self.fields_query_param: [f"Неизвестные поля: {', '.join(unknown)}."]})
+            fields = tuple((name, available[name]) for name in names)
+
+        if params.get(self.expand_query_param):
+            names = _names(params[self.expand_query_param])
+            unknown = [name for name in names if name not in self.expandable_fields]
+            if unknown:
+                raise ValidationError({self.expand_query_param: [f"Нельзя раскрыть: {', '.join(unknown)}."]})
+            # Раскрытое поле заменяет id на объект, а если его не просили — добавляется
+            expanded = {name: self.expandable_fields[name] for name in names}
+            fields = tuple((name, expanded.pop(name, src)) for name, src in fields) + tuple(expanded.items())
+        return fields
+
+    def read_queryset(self, extra=()):
+        fields = self.get_read_fields()
+        # Поля курсора пагинации нужны в строке, даже если их нет в ответе
+        columns = dict.fromkeys([*sources(fields), *getattr(self.paginator, "ordering", ()), *extra])
+        queryset = self.filter_queryset(self.get_queryset())
+        return queryset.values(*columns), compile_mapper(fields)
+
+    def read_list(self, request):
+        queryset, map_row = self.read_queryset()
+        page = self.paginate_queryset(queryset)
+        rows = list(queryset) if page is None else page
+        with profiling.phase("serialize"):
+            data = [map_row(row) for row in rows]
+        if page is not None:
+            return self.paginator.get_paginated_response(data).data
+        return data
+
+    def row_object(self, queryset, row):
+        """
+        Модель из строки .values() для проверки прав на объект, как в
+        get_object(). Невыбранные поля отложены и догружаются, только если
+        их спросит permission-класс.
+        """
+        model = queryset.model
+        attnames = [field.attname for field in model._meta.concrete_fields if field.attname in row]
+        return model.from_db(queryset.db, attnames, [row[name] for name in attnames])
+
+    def read_detail(self, request):
+        queryset, map_row = self.read_queryset(extra=[self.queryset.model._meta.pk.attname])
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        row = queryset.filter(**{self.lookup_field: self.kwargs[lookup_url_kwarg]}).first()
+        if row is None:
+            raise Http404
+        self.check_object_permissions(request, self.row_object(queryset, row))
+        with profiling.phase("serialize"):
+            return map_row(row)
@@ -0,0 +1,155 @@
+"""
+Синтетические данные для бенчмарков и проверки планов запросов:
+пользователи seed-N@example.com, столики с номерами после существующих
+и брони. seed() ставит брони на фиксированные слоты каждого столика,
+generate() — реалистичнее: месяцы истории, пики в обед и вечером,
+выходные загружены сильнее, часть гостей бронирует чаще остальных.
+"""
+import uuid
+from datetime import date, time, timedelta
+from itertools import accumulate
+
+from django.db import connection
+from django.db.models import Max
+from django.utils.timezone import now
+
+from tables import cache as table_cache
+from tables.models import Table
+from users.models import User
+from . import counters
+from .models import Reservation
+
+SEED_EMAIL = "seed-{}@example.com"
+SEED_SLOTS = (time(10, 0), time(12, 0), time(14, 0), time(16, 0), time(18, 0), time(20, 0))
+SEED_STATUSES = ("pending", "confirmed", "confirmed", "cancelled")
+
+# Вес часа начала брони: обеденный и вечерний пики
+PEAK_HOURS = {10: 1, 11: 2, 12: 6, 13: 7, 14: 3, 15: 1.5, 16: 1.5, 17: 3, 18: 7, 19: 9, 20: 7, 21: 3}
+DURATIONS = ((60, 3), (90, 5), (120, 2))
+WEEKEND_FACTOR = 1.5
+PAST_STATUSES = (("confirmed", 8), ("cancelled", 2))
+FUTURE_STATUSES = (("pending", 35), ("confirmed", 55), ("cancelled", 10))
+
+
+def create_users(users, rng):
+    """ users новых пользователей seed-N. Возвращает id всех seed-пользователей. """
+    first = User.objects.filter(email__startswith="seed-").count()
+    User.objects.bulk_create([
+        User(
+            email=SEED_EMAIL.format(n), phone=f"seed{n}", password="!",
+            verification_token=str(uuid.uuid4()) if rng.random() < 0.05 else None,
+            reset_token=str(uuid.uuid4()) if rng.random() < 0.01 else None,
+        )
+        for n in range(first, first + users)
+    ], batch_size=2000)
+    return list(User.objects.filter(email__startswith="seed-").order_by("id").values_list("id", flat=True))
+
+
+def create_tables(tables, rng):
+    """ tables столиков с номерами после существующих. """
+    number = (Table.objects.aggregate(top=Max("number"))["top"] or 0) + 1
+    created_tables = Table.objects.bulk_create([
+        Table(number=number + n, seats=rng.choice((2, 4, 6, 8)), type=rng.choice(Table.TYPE_CHOICES)[0])
+        for n in range(tables)
+    ])
+    table_cache.bump_version()  # bulk_create не шлёт post_save
+    return created_tables
+
+
+def finish():
+    """ Счётчики активных броней и статистика планировщика после массовой вставки. """
+    counters.reconcile()
+    with connection.cursor() as cursor:
+        for model in (User, Table, Reservation):
+            cursor.execute(f"ANALYZE {model._meta.db_table}")
+
+
+def seed(users, tables, days, rng):
+    """
+    Синтетические данные: users пользователей, tables столиков и по брони
+    на каждый из SEED_SLOTS каждого столика за days дней (статус случайный).
+    Вставка пачками через bulk_create, сигналы и письма не срабатывают.
+    """
+    user_ids = create_users(users, rng)
+    created_tables = create_tables(tables, rng)
+
+    start_day = date.today() - timedelta(days=days // 2)
+    batch, total = [], 0
+    for table in created_tables:
+        for offset in range(days):
+            day = start_day + timedelta(days=offset)
+            for slot in SEED_SLOTS:
+                start_at, end_at = Reservation.bounds(day, slot, 90)
+                batch.append(Reservation(
+                    user_id=rng.choice(user_ids), table=table, date=day, time=slot, duration=90,
+                    status=rng.choice(SEED_STATUSES), start_at=start_at, end_at=end_at,
+                ))
+        if len(batch) >= 5000:
+            total += len(Reservation.objects.bulk_create(batch))
+            batch = []
+    total += len(Reservation.objects.bulk_create(batch))
+    finish()
+    return total
+
+
+def day_plan(rng, mean, starts, weights):
+    """
+    Брони одного столика на день: [(время, длительность)] без пересечений.
+    Кандидаты берутся по весам часов, пересекающиеся отбрасываются.
+    """
+    wanted = max(round(rng.gauss(mean, mean / 3)), 0)
+    if not wanted:
+        return []
+    durations, duration_weights = zip(*DURATIONS)
+    plan, busy_until = [], -1
+    for minute in sorted(rng.choices(starts, weights, k=wanted * 2)):
+        if minute < busy_until:
+            continue
+        duration = rng.choices(durations, duration_weights)[0]
+        plan.append((time(minute // 60, minute % 60), duration))
+        busy_until = minute + duration
+        if len(plan) == wanted:
+            break
+    return plan
+
+
+def generate(tables, users, months, rng, per_day=4, ahead_days=30):
+    """
+    Реалистичные данные: users пользователей, tables столиков и брони за
+    months месяцев до сегодня и ahead_days дней вперёд. В среднем per_day
+    броней на столик в будний день (в выходные в WEEKEND_FACTOR раз больше),
+    начало — по PEAK_HOURS с шагом 30 минут. Прошедшие брони подтверждены
+    или отменены, будущие ещё и ожидают подтверждения — у них запланированы
+    напоминания, как у созданных через API. Возвращает число броней.
+    """
+    user_ids = create_users(users, rng)
+    created_tables = create_tables(tables, rng)
+    # Постоянные гости: вес пользователя убывает с его номером
+    user_weights = list(accumulate(1 / (rank + 1) ** 0.8 for rank in range(len(user_ids))))
+    starts = [hour * 60 + minute for hour in PEAK_HOURS for minute in (0, 30)]
+    weights = [PEAK_HOURS[minute // 60] for minute in starts]
+    current = now()
+    today = current.date()
+    first_day = today - timedelta(days=months * 30)
+
+    batch, total = [], 0
+    for offset in range((today - first_day).days + ahead_days):
+        day = first_day + timedelta(days=offset)
+        mean = per_day * (WEEKEND_FACTOR if day.weekday() >= 5 else 1)
+        for table in created_tables:
+            for slot, duration in day_plan(rng, mean, starts, weights):
+                start_at, end_at = Reservation.bounds(day, slot, duration)
+                statuses, status_weights = zip(*(PAST_STATUSES if start_at <= current else FUTURE_STATUSES))
+                reservation = Reservation(
+                    user_id=rng.choices(user_ids, cum_weights=user_weights)[0], table=table, date=day, time=slot,
+                    duration=duration, status=rng.choices(statuses, status_weights)[0],
+                    start_at=start_at, end_at=end_at,
+                )
+                reservation.plan_next_action()
+                batch.append(reservation)
+        if len(batch) >= 5000:
+            total += len(Reservation.objects.bulk_create(batch))
+            batch = []
+    total += len(Reservation.objects.bulk_create(batch))
+    finish()
+    return total
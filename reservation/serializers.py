@@ -1,28 +1,65 @@
+from contextlib import contextmanager
 from datetime import datetime, timedelta
+from django.db import IntegrityError, transaction
 from rest_framework import serializers
+from rest_framework.settings import api_settings
+from . import counters, occupancy
 from .models import Reservation
 
+OVERLAP_ERROR = "Этот столик уже забронирован на указанное время."
+
 
 def check_time_overlap(table, date, time, duration, exclude_reservation=None):
-    """ Проверяет, есть ли пересечение по времени для указанного столика. """
-    start_datetime = datetime.combine(date, time)
-    end_datetime = start_datetime + timedelta(minutes=duration)
+    """
+    Проверяет, есть ли пересечение по времени для указанного столика.
+    Один EXISTS-запрос по индексу (table, status, start_at, end_at), поэтому
+    учитываются и брони предыдущего дня, заканчивающиеся после полуночи.
+    Гонку между проверкой и вставкой закрывает exclusion-констрейнт.
+    """
+    start_at, end_at = Reservation.bounds(date, time, duration)
+
+    # Быстрый путь: Redis точно знает, что слот свободен. «Занято» из-за
+    # округления до 5 минут может быть ложным — его подтверждает SQL.
+    if not exclude_reservation and occupancy.is_free(table.id, start_at, end_at):
+        return
 
     overlapping_reservations = Reservation.objects.filter(
         table=table,
-        date=date,
-        status__in=["pending", "confirmed"]
+        status__in=Reservation.ACTIVE_STATUSES,
+        start_at__lt=end_at,
+        end_at__gt=start_at,
     )
 
     if exclude_reservation:
         overlapping_reservations = overlapping_reservations.exclude(id=exclude_reservation.id)
 
-    for reservation in overlapping_reservations:
-        existing_start = datetime.combine(reservation.date, reservation.time)
-        existing_end = existing_start + timedelta(minutes=reservation.duration)
+    if overlapping_reservations.exists():
+        raise serializers.ValidationError(OVERLAP_ERROR)
+
+
+@contextmanager
+def overlap_guard():
+    """
+    Переводит нарушение exclusion-констрейнта в ту же ошибку валидации,
+    что и check_time_overlap: параллельный запрос мог занять слот между
+    проверкой и вставкой.
+    """
+    try:
+        with transaction.atomic():
+            yield
+    except IntegrityError as exc:
+        if Reservation.OVERLAP_CONSTRAINT in str(exc):
+            raise serializers.ValidationError({api_settings.NON_FIELD_ERRORS_KEY: [OVERLAP_ERROR]})
+        raise
 
-        if start_datetime < existing_end and end_datetime > existing_start:
-            raise serializers.ValidationError("Этот столик уже забронирован на указанное время.")
+
+
+class AvailabilityQuerySerializer(serializers.Serializer):
+    """ Параметры поиска свободных столиков. """
+    date = serializers.DateField()
+    time = serializers.TimeField()
+    duration = serializers.IntegerField(min_value=1)
+    guests = serializers.IntegerField(min_value=1)
 
 
 
@@ -46,12 +83,9 @@ class ReservationCreateSerializer(serializers.ModelSerializer):
         if not all([table, date, time, duration]):
             raise serializers.ValidationError("Необходимо указать столик, дату, время и длительность.")
 
-        # Проверка на 3 активных бронирования
-        active_reservations = Reservation.objects.filter(
-            user=user, status__in=["pending", "confirmed"]
-        ).count()
-        if active_reservations >= 3:
-            raise serializers.ValidationError("У вас уже есть 3 активных бронирования.")
+        # Проверка на 3 активных бронирования по счётчику; гонку закрывает условный UPDATE в create()
+        if user.active_reservations_count >= counters.MAX_ACTIVE_RESERVATIONS:
+            raise serializers.ValidationError(counters.LIMIT_ERROR)
 
         # Проверка пересечения по времени
         check_time_overlap(table, date, time, duration)
@@ -62,7 +96,10 @@ class ReservationCreateSerializer(serializers.ModelSerializer):
         """ Создание бронирования с привязкой к пользователю. """
         request = self.context.get("request")
         validated_data["user"] = request.user
-        return super().create(validated_data)
+        with overlap_guard():
+            if not counters.acquire(request.user):
+                raise serializers.ValidationError({api_settings.NON_FIELD_ERRORS_KEY: [counters.LIMIT_ERROR]})
+            return super().create(validated_data)
 
 
 
@@ -98,7 +135,8 @@ class ReservationUpdateSerializer(serializers.ModelSerializer):
         instance.date = validated_data.get("date", instance.date)
         instance.time = validated_data.get("time", instance.time)
         instance.duration = validated_data.get("duration", instance.duration)
-        instance.save()
+        with overlap_guard():
+            instance.save()
         return instance
 
 
@@ -127,5 +165,27 @@ class ReservationCancelSerializer(serializers.ModelSerializer):
     def update(self, instance, validated_data):
         """ Отмена бронирования (изменение статуса). """
         instance.status = "cancelled"
-        instance.save()
+        with transaction.atomic():
+            instance.save(update_fields=["status"])
+            counters.release([instance.user_id])
         return instance
+
+
+
+class BulkReservationItemSerializer(serializers.Serializer):
+    """ Элемент пакетного бронирования; столики разрешаются одним запросом в bulk.py. """
+    table = serializers.IntegerField(min_value=1)
+    date = serializers.DateField()
+    time = serializers.TimeField()
+    duration = serializers.IntegerField(min_value=1)
+
+
+class ReservationBulkCreateSerializer(serializers.Serializer):
+    MODE_CHOICES = [
+        ("atomic", "Всё или ничего"),
+        ("best_effort", "Создать всё, что возможно"),
+    ]
+
+    mode = serializers.ChoiceField(choices=MODE_CHOICES, default="atomic")
+    reservations = BulkReservationItemSerializer(many=True, allow_empty=False, max_length=200)
+
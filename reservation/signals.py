@@ -1,15 +1,16 @@
 
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
-from django.core.mail import send_mail
 from django.conf import settings
-from .models import Reservation
-from .tasks import schedule_reminders
+from . import counters, events, list_cache, occupancy
+from .models import Reservation, ReservationTombstone
+from .utils import send_email
 
 @receiver(post_save, sender=Reservation)
 def reservation_created(sender, instance, created, **kwargs):
     """
-    Отправляет email с подтверждением бронирования и запланированными напоминаниями.
+    Отправляет email с подтверждением бронирования.
     """
     if created:
         confirm_link = f"{settings.SITE_URL}/api/reservation/reservations/confirm/{instance.confirmation_token}/"
@@ -23,8 +24,53 @@ def reservation_created(sender, instance, created, **kwargs):
             f"Спасибо за выбор нашего ресторана!"
         )
 
-        send_mail(subject, message, settings.DEFAULT_FROM_EMAIL, [instance.user.email])
+        # Письмо уходит через outbox в той же транзакции, что и бронь
+        send_email(instance.user.email, subject, message)
+        # Напоминания и автоотмену выполнит sweeper по next_action_at, см. Reservation.save()
 
 
-        schedule_reminders.delay(instance.id)
+@receiver(post_save, sender=Reservation)
+def reservation_occupancy_changed(sender, instance, created, update_fields=None, **kwargs):
+    """
+    Обновляет занятость в Redis и публикует событие для подписчиков после
+    коммита: создание, перенос, отмена и подтверждение проходят через save().
+    """
+    old_slot = getattr(instance, "_occupied_slot", None)
+    new_slot = instance.occupied_slot()
+    if old_slot != new_slot:
+        transaction.on_commit(lambda: occupancy.apply_change(old_slot, new_slot))
+        kind = events.CREATED if created else events.CANCELLED if new_slot is None else events.UPDATED
+        transaction.on_commit(lambda: events.publish(kind, [(old_slot, new_slot)]))
+    elif new_slot and instance.status == "confirmed" and update_fields and "status" in update_fields:
+        transaction.on_commit(lambda: events.publish(events.CONFIRMED, [(new_slot, new_slot)]))
+    instance._occupied_slot = new_slot
+
+
+@receiver(post_delete, sender=Reservation)
+def reservation_occupancy_released(sender, instance, **kwargs):
+    """ Освобождает слоты удалённой брони. """
+    old_slot = instance.occupied_slot()
+    if old_slot:
+        transaction.on_commit(lambda: occupancy.apply_change(old_slot, None))
+        transaction.on_commit(lambda: events.publish(events.CANCELLED, [(old_slot, None)]))
+
+
+@receiver(post_save, sender=Reservation)
+@receiver(post_delete, sender=Reservation)
+def reservation_list_changed(sender, instance, **kwargs):
+    """ Любое изменение брони через save()/delete() меняет метку списка владельца. """
+    list_cache.bump_on_commit([instance.user_id])
+
+
+@receiver(post_delete, sender=Reservation)
+def reservation_tombstone(sender, instance, **kwargs):
+    """ Удаление попадает в дельта-синхронизацию как метка с id брони. """
+    ReservationTombstone.objects.create(reservation_id=instance.id, user_id=instance.user_id)
+
+
+@receiver(post_delete, sender=Reservation)
+def reservation_counter_released(sender, instance, **kwargs):
+    """ Удалённая активная бронь больше не занимает место в лимите пользователя. """
+    if instance.status in Reservation.ACTIVE_STATUSES:
+        counters.release([instance.user_id])
 
@@ -0,0 +1,155 @@
+"""
+Поток изменений доступности по SSE (через ASGI, reservation_System/asgi.py).
+
+Маршрут обслуживается только ASGI-сервером, например
+    uvicorn reservation_System.asgi:application
+Под WSGI (gunicorn reservation_System.wsgi) каждое соединение держало бы
+воркер, пока клиент не уйдёт, поэтому там поток отвечает 501; прокси
+направляет /api/reservation/availability/stream/ на ASGI-процессы.
+
+Клиент подписывается на дату: GET /api/reservation/availability/stream/?date=YYYY-MM-DD
+и получает события из events.publish. В каждом процессе одно соединение
+с Redis (PSUBSCRIBE availability:*) раздаёт сообщения по asyncio-очередям
+подписчиков, поэтому простаивающий подписчик стоит одну очередь и корутину.
+"""
+import asyncio
+import json
+import logging
+from datetime import date
+
+import redis.asyncio as aioredis
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponseBadRequest, JsonResponse, StreamingHttpResponse
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken, TokenError
+from rest_framework_simplejwt.tokens import AccessToken
+
+from users.authentication import CachedJWTAuthentication
+from . import events
+
+logger = logging.getLogger(__name__)
+
+HEARTBEAT_SECONDS = 15
+QUEUE_SIZE = 100
+RECONNECT_SECONDS = 1
+
+
+class Broadcaster:
+    """ Раздаёт сообщения одного PSUBSCRIBE подписчикам процесса по каналам. """
+
+    def __init__(self, url):
+        self.url = url
+        self.subscribers = {}
+        self._reader = None
+
+    def subscribe(self, channel):
+        queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        self.subscribers.setdefault(channel, set()).add(queue)
+        if self._reader is None or self._reader.done():
+            self._reader = asyncio.get_running_loop().create_task(self._read())
+        return queue
+
+    def unsubscribe(self, channel, queue):
+        queues = self.subscribers.get(channel)
+        if queues is not None:
+            queues.discard(queue)
+            if not queues:
+                del self.subscribers[channel]
+        # На тихом канале читатель не дождётся сообщения, чтобы заметить уход
+        # последнего подписчика, — останавливаем его и закрываем соединение сразу
+        if not self.subscribers and self._reader is not None:
+            self._reader.cancel()
+            self._reader = None
+
+    def count(self):
+        return sum(len(queues) for queues in self.subscribers.values())
+
+    def dispatch(self, channel, data):
+        for queue in list(self.subscribers.get(channel, ())):
+            try:
+                queue.put_nowait(data)
+            except asyncio.QueueFull:
+                # Медленный клиент: сбрасываем очередь и просим перечитать доступность
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(json.dumps({"event": "resync"}))
+
+    async def _read(self):
+        while self.subscribers:
+            client = aioredis.Redis.from_url(self.url)
+            try:
+                async with client.pubsub() as pubsub:
+                    await pubsub.psubscribe("availability:*")
+                    async for message in pubsub.listen():
+                        if message["type"] == "pmessage":
+                            self.dispatch(message["channel"].decode(), message["data"].decode())
+                        if not self.subscribers:
+                            return
+            except aioredis.RedisError:
+                logger.warning("Поток событий доступности: Redis недоступен, переподключение", exc_info=True)
+                await asyncio.sleep(RECONNECT_SECONDS)
+            finally:
+                await client.aclose()
+
+
+_broadcasters = {}
+
+
+def get_broadcaster():
+    """ Один Broadcaster на event loop процесса. """
+    loop = asyncio.get_running_loop()
+    if loop not in _broadcasters:
+        _broadcasters[loop] = Broadcaster(settings.AVAILABILITY_EVENTS_REDIS_URL)
+    return _broadcasters[loop]
+
+
+def authenticate(request):
+    """
+    JWT из заголовка Authorization или ?access_token= (EventSource не умеет
+    заголовки). Пользователь проверяется как в API: существует, активен,
+    пароль не сменён (CachedJWTAuthentication, обычно без запроса к БД).
+    """
+    header = request.headers.get("Authorization", "")
+    raw = header.split(" ", 1)[1] if header.startswith("Bearer ") else request.GET.get("access_token")
+    if not raw:
+        return None
+    try:
+        return CachedJWTAuthentication().get_user(AccessToken(raw))
+    except (TokenError, InvalidToken, AuthenticationFailed):
+        return None
+
+
+async def event_stream(channel):
+    broadcaster = get_broadcaster()
+    queue = broadcaster.subscribe(channel)
+    try:
+        yield f"retry: {RECONNECT_SECONDS * 1000}\nevent: ready\ndata: {{}}\n\n"
+        while True:
+            try:
+                data = await asyncio.wait_for(queue.get(), HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                yield ": ping\n\n"
+                continue
+            yield f"event: slot\ndata: {data}\n\n"
+    finally:
+        broadcaster.unsubscribe(channel, queue)
+
+
+async def availability_stream(request):
+    """ SSE-поток изменений слотов на дату. """
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse({"detail": "Поток доступен только через ASGI-сервер."}, status=501)
+    if await sync_to_async(authenticate)(request) is None:
+        return JsonResponse({"detail": "Требуется авторизация."}, status=401)
+    try:
+        day = date.fromisoformat(request.GET.get("date", ""))
+    except ValueError:
+        return HttpResponseBadRequest("Укажите date в формате YYYY-MM-DD.")
+    if not events.enabled():
+        return JsonResponse({"detail": "Поток событий отключён."}, status=503)
+
+    response = StreamingHttpResponse(event_stream(events.channel(day)), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
@@ -0,0 +1,112 @@
+"""
+Дельта-синхронизация броней: клиент присылает курсор из прошлого ответа и
+получает только брони с updated_at после него и id удалённых (метки
+ReservationTombstone). Курсор — момент запроса минус SYNC_LAG: транзакция,
+поставившая updated_at чуть раньше, но закоммиченная позже, попадёт в
+следующую выдачу. Повторы возможны, клиент применяет изменения по id.
+
+Выдача идёт страницами по SYNC_PAGE_SIZE строк в порядке (updated_at, id).
+Пока has_more, курсор ответа — продолжение: он помнит since, итоговый курсор
+и (updated_at, id) последней отданной строки; клиент сразу запрашивает
+следующую страницу с since=<cursor>. Метки удаления — только на первой странице.
+"""
+import base64
+import json
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils.timezone import now
+from rest_framework.exceptions import APIException, ValidationError
+
+from .models import ReservationTombstone
+
+
+class CursorExpired(APIException):
+    status_code = 410
+    default_detail = "Курсор устарел, нужна полная синхронизация (запрос без since)."
+    default_code = "cursor_expired"
+
+
+def encode_cursor(moment, since=None, after=None):
+    """ Итоговый курсор — момент; с after=(updated_at, id) — продолжение выдачи. """
+    if after is None:
+        raw = moment.isoformat()
+    else:
+        raw = json.dumps({
+            "since": since and since.isoformat(),
+            "cursor": moment.isoformat(),
+            "after": [after[0].isoformat(), after[1]],
+        })
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def _moment(value):
+    moment = datetime.fromisoformat(value)
+    if moment.tzinfo is None:
+        raise ValueError(value)
+    return moment
+
+
+def decode_cursor(value):
+    """
+    Курсор -> (since, continuation). since — aware datetime или None (полная
+    синхронизация), continuation — (итоговый курсор, updated_at, id) последней
+    отданной строки или None.
+    """
+    if not value:
+        return None, None
+    try:
+        raw = base64.urlsafe_b64decode(value.encode()).decode()
+        if raw.startswith("{"):
+            data = json.loads(raw)
+            since = data["since"] and _moment(data["since"])
+            continuation = (_moment(data["cursor"]), _moment(data["after"][0]), int(data["after"][1]))
+        else:
+            since, continuation = _moment(raw), None
+    except (ValueError, KeyError, IndexError, TypeError):
+        raise ValidationError({"since": ["Неверный курсор."]})
+    # Старые метки удаления чистятся, по такому курсору удаления уже не восстановить
+    if since is not None and since < now() - timedelta(days=settings.SYNC_TOMBSTONE_DAYS):
+        raise CursorExpired()
+    return since, continuation
+
+
+def changes_since(queryset, since, user=None, continuation=None):
+    """
+    Страница изменений после since: (строки .values() из queryset, id удалённых,
+    курсор, есть ли ещё страницы). В строках нужны updated_at и id.
+    user=None — метки удаления всех пользователей (для администратора).
+    """
+    limit = settings.SYNC_PAGE_SIZE
+    tombstones = ReservationTombstone.objects.all()
+    if user is not None:
+        tombstones = tombstones.filter(user_id=user.pk)
+    if since is not None:
+        queryset = queryset.filter(updated_at__gt=since)
+        tombstones = tombstones.filter(deleted_at__gt=since)
+    else:
+        # При полной синхронизации удаления не нужны: удалённых строк и так нет в выдаче
+        tombstones = tombstones.none()
+    if continuation is not None:
+        cursor, last_at, last_id = continuation
+        queryset = queryset.filter(Q(updated_at__gt=last_at) | Q(updated_at=last_at, id__gt=last_id))
+        tombstones = tombstones.none()
+    else:
+        cursor = now() - timedelta(seconds=settings.SYNC_LAG_SECONDS)
+
+    rows = list(queryset.order_by("updated_at", "id")[:limit + 1])
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    deleted = list(tombstones.order_by("deleted_at").values_list("reservation_id", flat=True))
+    if has_more:
+        last = rows[-1]
+        return rows, deleted, encode_cursor(cursor, since, (last["updated_at"], last["id"])), True
+    return rows, deleted, encode_cursor(cursor), False
+
+
+def prune_tombstones():
+    """ Удаляет метки старше SYNC_TOMBSTONE_DAYS. Возвращает число удалённых. """
+    border = now() - timedelta(days=settings.SYNC_TOMBSTONE_DAYS)
+    deleted, _ = ReservationTombstone.objects.filter(deleted_at__lt=border).delete()
+    return deleted
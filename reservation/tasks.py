@@ -1,64 +1,207 @@
+from collections import Counter
+
 from celery import shared_task
 from django.conf import settings
-from django.utils.timezone import now, make_aware
-from datetime import datetime, timedelta
-from .models import Reservation
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.utils.timezone import now
+from monitoring import task_metrics
+from notifications.utils import enqueue_emails
+from . import counters, events, list_cache, occupancy, sync
+from .models import (
+    ACTION_AUTO_CANCEL,
+    ACTION_CONFIRM_REQUEST,
+    ACTION_REMINDER,
+    AUTO_CANCEL_LEAD,
+    Reservation,
+)
 from .utils import send_email
 
+# Поля, нужные задачам: данные брони, границы слота для Redis и email владельца
+TASK_FIELDS = (
+    "id", "table_id", "date", "time", "duration", "status", "start_at", "end_at",
+    "confirmation_token", "next_action", "next_action_at", "updated_at", "user__email",
+)
+
 @shared_task
 def send_email_notification(user_email, subject, message):
     """ Celery-задача для отправки email. """
     send_email(user_email, subject, message)
 
+
+def confirmation_link(reservation):
+    return f"{settings.SITE_URL}/confirm/{reservation.confirmation_token}"
+
+
+def action_email(action, reservation):
+    """ (тема, текст) письма для действия sweeper-а. """
+    if action == ACTION_REMINDER:
+        return ("Напоминание о бронировании",
+                f"Ваше бронирование на {reservation.date} {reservation.time} начнется через 1 час.")
+    if action == ACTION_CONFIRM_REQUEST:
+        return ("Подтвердите бронирование",
+                f"Пожалуйста, подтвердите ваше бронирование на {reservation.date} {reservation.time}, "
+                f"иначе оно будет отменено.\n"
+                f"Подтвердите его здесь: {confirmation_link(reservation)}")
+    return ("Бронирование отменено",
+            f"Ваше бронирование на {reservation.date} {reservation.time} было автоматически отменено, "
+            f"так как не было подтверждено.")
+
+
+def dispatch_due_actions(batch_size):
+    """
+    Выполняет одну пачку наступивших действий: выборка по индексу
+    next_action_at с SKIP LOCKED, письма одним INSERT в outbox, статусы
+    и следующие действия одним bulk_update. Возвращает счётчик по действиям.
+    """
+    done = Counter()
+    current = now()
+    with transaction.atomic():
+        due = list(
+            Reservation.objects.select_for_update(skip_locked=True, of=("self",))
+            .filter(next_action_at__lte=current)
+            .select_related("user")
+            .only(*TASK_FIELDS)
+            .order_by("next_action_at")[:batch_size]
+        )
+        emails, released, released_users = [], [], []
+        for reservation in due:
+            action = reservation.next_action
+            task_metrics.observe_action_lag(action, [(current - reservation.next_action_at).total_seconds()])
+            if reservation.end_at <= current:
+                # Бронь уже прошла (sweeper простаивал): отменять и писать поздно
+                reservation.next_action = reservation.next_action_at = None
+                continue
+            if action == ACTION_AUTO_CANCEL:
+                if reservation.status != "pending":  # Уже подтвердили или отменили
+                    reservation.plan_next_action(after=action)
+                    continue
+                released.append((reservation.occupied_slot(), None))
+                released_users.append(reservation.user_id)
+                reservation.status = "cancelled"
+                reservation.updated_at = current
+
+            subject, message = action_email(action, reservation)
+            emails.append((reservation.user.email, subject, message, settings.DEFAULT_FROM_EMAIL))
+            reservation.plan_next_action(after=action)
+            done[action] += 1
+
+        Reservation.objects.bulk_update(due, ["status", "next_action", "next_action_at", "updated_at"])
+        counters.release(released_users)
+        list_cache.bump_on_commit(released_users)
+        enqueue_emails(emails)
+        if released:
+            # bulk_update не шлёт post_save — освобождаем слоты в Redis сами
+            transaction.on_commit(lambda: occupancy.apply_changes(released))
+            transaction.on_commit(lambda: events.publish(events.AUTO_CANCELLED, released))
+    return done, len(due)
+
+
+def cancel_unconfirmed():
+    """
+    Отменяет все неподтверждённые брони, до начала которых осталось меньше
+    AUTO_CANCEL_LEAD, одним UPDATE ... RETURNING. Только те, кому уже ушёл
+    запрос подтверждения (next_action = auto_cancel); уже закончившиеся
+    брони не трогаем. Письма — одним INSERT в outbox, слоты в Redis освобождаются
+    после коммита. Возвращает число отменённых броней.
+    """
+    current = now()
+    sql = f"""
+        UPDATE {Reservation._meta.db_table} AS r
+        SET status = 'cancelled', next_action = NULL, next_action_at = NULL, updated_at = %s
+        FROM {get_user_model()._meta.db_table} AS u
+        WHERE u.id = r.user_id AND r.status = 'pending' AND r.next_action = %s
+          AND r.start_at <= %s AND r.end_at > %s
+        RETURNING r.table_id, r.start_at, r.end_at, r.date, r.time, u.email, u.id
+    """
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [current, ACTION_AUTO_CANCEL, current + AUTO_CANCEL_LEAD, current])
+            cancelled = cursor.fetchall()
+        enqueue_emails([
+            (email, *action_email(ACTION_AUTO_CANCEL, Reservation(date=day, time=start_time)),
+             settings.DEFAULT_FROM_EMAIL)
+            for _, _, _, day, start_time, email, _ in cancelled
+        ])
+        counters.release([user_id for *_, user_id in cancelled])
+        list_cache.bump_on_commit(user_id for *_, user_id in cancelled)
+        # Отмена должна была случиться за AUTO_CANCEL_LEAD до начала
+        task_metrics.observe_action_lag(ACTION_AUTO_CANCEL, [
+            (current - (start_at - AUTO_CANCEL_LEAD)).total_seconds() for _, start_at, *_ in cancelled
+        ])
+        if cancelled:
+            released = [((table_id, start_at, end_at), None) for table_id, start_at, end_at, *_ in cancelled]
+            transaction.on_commit(lambda: occupancy.apply_changes(released))
+            transaction.on_commit(lambda: events.publish(events.AUTO_CANCELLED, released))
+    return len(cancelled)
+
+
+@shared_task
+def auto_cancel_unconfirmed():
+    """ Пакетная автоотмена: пропускная способность не зависит от числа задач. """
+    return cancel_unconfirmed()
+
+
+@shared_task
+def sweep_reservation_actions():
+    """
+    Периодическая задача (раз в минуту): напоминания, запросы подтверждения
+    и автоотмены для всех броней, чьё время действия наступило. Память не
+    зависит от числа будущих броней, а перенос брони просто сдвигает
+    next_action_at — устаревших ETA-задач больше нет.
+    """
+    totals = Counter()
+    # Автоотмены одним запросом, оставшиеся действия — пачками ниже
+    cancelled = cancel_unconfirmed()
+    if cancelled:
+        totals[ACTION_AUTO_CANCEL] = cancelled
+    while True:
+        done, fetched = dispatch_due_actions(settings.RESERVATION_SWEEP_BATCH_SIZE)
+        totals.update(done)
+        if fetched < settings.RESERVATION_SWEEP_BATCH_SIZE:
+            break
+    return dict(totals)
+
+
+@shared_task
+def prune_sync_tombstones():
+    """ Чистит старые метки удалений дельта-синхронизации (раз в сутки). """
+    return sync.prune_tombstones()
+
+
 @shared_task
 def schedule_reminders(reservation_id):
-    """ Планируем напоминания и автоотмену брони. """
+    """
+    Оставлена для задач, поставленных до перехода на sweeper:
+    перепланирует следующее действие брони.
+    """
     try:
-        reservation = Reservation.objects.get(id=reservation_id)
-        start_time = reservation.time
-        date = reservation.date
-        start_datetime = make_aware(datetime.combine(date, start_time))
-
-        # Формируем ссылку для подтверждения
-        confirmation_link = f"{settings.SITE_URL}/confirm/{reservation.confirmation_token}"
-
-        # Напоминание за 1 час
-        reminder_time = start_datetime - timedelta(hours=1)
-        if reminder_time > now():
-            send_email_notification.apply_async(
-                args=[reservation.user.email, "Напоминание о бронировании",
-                      f"Ваше бронирование на {date} {start_time} начнется через 1 час."],
-                eta=reminder_time
-            )
-
-        # Запрос на подтверждение за 15 минут
-        confirm_time = start_datetime - timedelta(minutes=15)
-        if confirm_time > now():
-            send_email_notification.apply_async(
-                args=[reservation.user.email, "Подтвердите бронирование",
-                      f"Пожалуйста, подтвердите ваше бронирование на {date} {start_time}, иначе оно будет отменено.\n"
-                      f"Подтвердите его здесь: {confirmation_link}"],
-                eta=confirm_time
-            )
-
-            # Автоотмена, если не подтвердили
-            auto_cancel_time = start_datetime - timedelta(minutes=14)
-            auto_cancel_reservation.apply_async(args=[reservation.id], eta=auto_cancel_time)
-
+        reservation = Reservation.objects.only("status", "start_at").get(id=reservation_id)
     except Reservation.DoesNotExist:
-        pass
+        return
+    reservation.plan_next_action()
+    Reservation.objects.filter(id=reservation_id).update(
+        next_action=reservation.next_action, next_action_at=reservation.next_action_at
+    )
 
 @shared_task
 def auto_cancel_reservation(reservation_id):
-    """ Отмена брони, если не подтверждена за 15 минут. """
+    """
+    Отмена брони, если не подтверждена за 15 минут. Осталась для ETA-задач,
+    поставленных до перехода на sweeper; брони с next_action ведёт sweeper.
+    """
     try:
-        reservation = Reservation.objects.get(id=reservation_id)
+        reservation = Reservation.objects.select_related("user").only(*TASK_FIELDS).get(id=reservation_id)
+        if reservation.next_action is not None:
+            return
         if reservation.status == "pending":  # Только если не подтверждена
-            reservation.status = "cancelled"
-            reservation.save()
-            send_email_notification.delay(
-                reservation.user.email, "Бронирование отменено",
-                f"Ваше бронирование на {reservation.date} {reservation.time} было автоматически отменено, так как не было подтверждено."
-            )
+            with transaction.atomic():
+                reservation.status = "cancelled"
+                reservation.save(update_fields=["status"])
+                counters.release([reservation.user_id])
+                send_email(
+                    reservation.user.email, "Бронирование отменено",
+                    f"Ваше бронирование на {reservation.date} {reservation.time} было автоматически отменено, так как не было подтверждено."
+                )
     except Reservation.DoesNotExist:
         pass
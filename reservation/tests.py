@@ -1,3 +1,432 @@
-from django.test import TestCase
+import asyncio
+import random
+from datetime import date, datetime, time, timedelta
+from unittest import mock
 
-# Create your tests here.
+import fakeredis
+import orjson
+import redis
+from django.test import AsyncClient, SimpleTestCase, TestCase, override_settings
+from django.utils.timezone import localtime, make_aware, now
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.renderers import JSONRenderer
+from rest_framework.serializers import ModelSerializer
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from notifications.models import OutboxEmail
+from tables.models import Table
+from users.models import User
+from . import counters, list_cache, occupancy, streams
+from .models import ACTION_AUTO_CANCEL, Reservation
+from .rows import ORJSONRenderer, compile_mapper
+from .seed import generate
+from .tasks import auto_cancel_reservation, cancel_unconfirmed, sweep_reservation_actions
+
+
+@override_settings(OCCUPANCY_ENABLED=False, TABLE_CACHE_ENABLED=False, AUTH_USER_CACHE_ENABLED=False,
+                   RESERVATION_LIST_CACHE_ENABLED=False, AVAILABILITY_EVENTS_ENABLED=False)
+class QueryCountTestCase(TestCase):
+    """
+    Фиксирует число SQL-запросов на эндпоинтах и в задачах, чтобы экономия
+    от select_related/only не потерялась незаметно. Redis и Celery отключены.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("guest@example.com", "+70000000001", "secret123")
+        cls.staff = User.objects.create_user("admin@example.com", "+70000000002", "secret123",
+                                             is_staff=True, is_superuser=True)
+        cls.tables = [Table.objects.create(number=i, seats=4, type="standard") for i in range(1, 6)]
+        cls.day = date.today() + timedelta(days=7)
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def make_reservations(self, count, user=None, status="pending"):
+        """ Брони на 10:00 по кругу столиков, каждый круг — следующий день. """
+        created = []
+        for _ in range(count):
+            n = Reservation.objects.count()
+            created.append(Reservation.objects.create(
+                user=user or self.user, table=self.tables[n % len(self.tables)],
+                date=self.day + timedelta(days=n // len(self.tables)), time=time(10, 0),
+                duration=60, status=status,
+            ))
+        return created
+
+
+class ReservationEndpointQueryTests(QueryCountTestCase):
+
+    def test_list_queries_do_not_grow_with_rows(self):
+        self.make_reservations(3)
+        self.client.force_authenticate(self.user)
+        with self.assertNumQueries(1):
+            self.client.get("/api/reservation/reservations/")
+
+        self.make_reservations(10, user=self.staff)
+        self.client.force_authenticate(self.staff)
+        with self.assertNumQueries(1):
+            self.client.get("/api/reservation/reservations/")
+
+    def test_detail_checks_object_permissions(self):
+        reservation = self.make_reservations(1)[0]
+        self.client.force_authenticate(self.user)
+        url = f"/api/reservation/reservations/{reservation.id}/"
+        with self.assertNumQueries(1):
+            response = self.client.get(url, {"fields": "table,status", "expand": "table"})
+        self.assertEqual(response.json(), {"table": {"id": self.tables[0].id, "number": 1, "seats": 4,
+                                                     "type": "standard"}, "status": "pending"})
+        with mock.patch.object(IsAuthenticated, "has_object_permission", return_value=False) as check:
+            self.assertEqual(self.client.get(url).status_code, 403)
+        self.assertEqual(check.call_args.args[2].pk, reservation.id)
+
+    def test_values_path_matches_serializer(self):
+        class Serializer(ModelSerializer):
+            class Meta:
+                model = Reservation
+                fields = ["id", "table", "date", "time", "duration", "status", "created_at", "updated_at"]
+
+        self.make_reservations(2)
+        queryset = Reservation.objects.order_by("id")
+        pairs = tuple((name, "table_id" if name == "table" else name) for name in Serializer.Meta.fields)
+        map_row = compile_mapper(pairs)
+        fast = ORJSONRenderer().render([map_row(row) for row in queryset.values(*(src for _, src in pairs))])
+        slow = JSONRenderer().render(Serializer(queryset, many=True).data)
+        self.assertEqual(orjson.loads(fast), orjson.loads(slow))
+        self.assertTrue(orjson.loads(fast)[0]["created_at"].endswith("Z"))
+
+    def test_sparse_fields_and_expand(self):
+        self.make_reservations(3)
+        self.client.force_authenticate(self.user)
+        with self.assertNumQueries(1):
+            response = self.client.get("/api/reservation/reservations/", {"fields": "id,table,time,status"})
+        self.assertEqual(list(response.data["results"][0]), ["id", "table", "time", "status"])
+
+        with self.assertNumQueries(1):
+            response = self.client.get("/api/reservation/reservations/", {"expand": "table,user"})
+        row = response.data["results"][0]
+        self.assertEqual(row["table"]["number"], self.tables[0].number)
+        self.assertEqual(row["user"], {"id": self.user.id, "email": self.user.email})
+
+        response = self.client.get("/api/reservation/reservations/", {"fields": "id,secret"})
+        self.assertEqual(response.status_code, 400)
+
+    @override_settings(SYNC_LAG_SECONDS=0)
+    def test_sync_returns_only_changes_after_cursor(self):
+        first, second, third = self.make_reservations(3)
+        self.client.force_authenticate(self.user)
+        response = self.client.get("/api/reservation/reservations/sync/")
+        self.assertEqual(len(response.data["changed"]), 3)
+
+        self.client.post(f"/api/reservation/reservations/{first.id}/cancel/")
+        deleted_id = third.id
+        third.delete()
+        # изменения, метки удаления; курсор не зависит от размера истории
+        with self.assertNumQueries(2):
+            response = self.client.get("/api/reservation/reservations/sync/", {"since": response.data["cursor"]})
+        self.assertEqual([(row["id"], row["status"]) for row in response.data["changed"]], [(first.id, "cancelled")])
+        self.assertEqual(response.data["deleted"], [deleted_id])
+
+    @override_settings(SYNC_LAG_SECONDS=0, SYNC_PAGE_SIZE=2)
+    def test_full_sync_is_paged(self):
+        created = self.make_reservations(5)
+        self.client.force_authenticate(self.user)
+        pages, params = [], {}
+        while True:
+            # одна выборка на страницу, какой бы длинной ни была история
+            with self.assertNumQueries(1):
+                response = self.client.get("/api/reservation/reservations/sync/", params)
+            pages.append([row["id"] for row in response.data["changed"]])
+            params = {"since": response.data["cursor"]}
+            if not response.data["has_more"]:
+                break
+        self.assertEqual([len(page) for page in pages], [2, 2, 1])
+        self.assertEqual(sorted(sum(pages, [])), sorted(r.id for r in created))
+
+        self.client.post(f"/api/reservation/reservations/{created[0].id}/cancel/")
+        response = self.client.get("/api/reservation/reservations/sync/", params)
+        self.assertEqual([row["id"] for row in response.data["changed"]], [created[0].id])
+        self.assertFalse(response.data["has_more"])
+
+    def test_create(self):
+        self.client.force_authenticate(self.user)
+        payload = {"table": self.tables[0].id, "date": self.day, "time": "19:00", "duration": 90}
+        # столик, пересечение, SAVEPOINT, UPDATE счётчика, INSERT брони и письма, RELEASE
+        with self.assertNumQueries(7):
+            response = self.client.post("/api/reservation/reservations/", payload)
+        self.assertEqual(response.status_code, 201)
+
+    def test_confirm(self):
+        reservation = self.make_reservations(1)[0]
+        with self.assertNumQueries(2):
+            response = self.client.get(
+                f"/api/reservation/reservations/confirm/{reservation.confirmation_token}/"
+            )
+        self.assertEqual(response.status_code, 200)
+
+    def test_cancel(self):
+        reservation = self.make_reservations(1)[0]
+        self.client.force_authenticate(self.user)
+        # выборка, SAVEPOINT, UPDATE статуса, UPDATE счётчика, RELEASE
+        with self.assertNumQueries(5):
+            response = self.client.post(f"/api/reservation/reservations/{reservation.id}/cancel/")
+        self.assertEqual(response.status_code, 200)
+
+    def test_availability(self):
+        self.make_reservations(5)
+        self.client.force_authenticate(self.user)
+        with self.assertNumQueries(2):
+            response = self.client.get("/api/reservation/reservations/availability/", {
+                "date": self.day, "time": "10:30", "duration": 60, "guests": 2,
+            })
+        self.assertEqual(response.data, [])
+
+
+    def test_availability_sees_midnight_and_long_bookings(self):
+        before = self.day - timedelta(days=1)
+        # 23:30–01:30 через полночь на первом столике, бронь через двое суток на втором
+        Reservation.objects.create(user=self.staff, table=self.tables[0], date=before, time=time(23, 30), duration=120)
+        Reservation.objects.create(user=self.staff, table=self.tables[1], date=self.day + timedelta(days=2),
+                                   time=time(10, 0), duration=60)
+        self.client.force_authenticate(self.user)
+        url = "/api/reservation/reservations/availability/"
+        response = self.client.get(url, {"date": self.day, "time": "01:00", "duration": 60, "guests": 2})
+        self.assertEqual([table["id"] for table in response.data], [table.id for table in self.tables[1:]])
+
+        response = self.client.get(url, {"date": self.day, "time": "12:00", "duration": 3 * 24 * 60, "guests": 2})
+        self.assertNotIn(self.tables[1].id, [table["id"] for table in response.data])
+        self.assertEqual(len(response.data), 4)
+
+class ActiveReservationCounterTests(QueryCountTestCase):
+
+    def test_limit_is_enforced_by_counter(self):
+        self.client.force_authenticate(self.user)
+        for hour in (10, 12, 14, 16):
+            response = self.client.post("/api/reservation/reservations/", {
+                "table": self.tables[0].id, "date": self.day, "time": f"{hour}:00", "duration": 60,
+            })
+        self.assertEqual(response.status_code, 400)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.active_reservations_count, 3)
+
+        reservation = Reservation.objects.filter(user=self.user).first()
+        self.client.post(f"/api/reservation/reservations/{reservation.id}/cancel/")
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.active_reservations_count, 2)
+
+    def test_reconcile(self):
+        self.make_reservations(2)
+        self.make_reservations(1, status="cancelled")
+        self.assertEqual(counters.reconcile(), 1)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.active_reservations_count, 2)
+        self.assertEqual(counters.reconcile(), 0)
+
+
+@override_settings(RESERVATION_LIST_CACHE_ENABLED=True)
+class ReservationListCacheTests(QueryCountTestCase):
+
+    def setUp(self):
+        super().setUp()
+        patcher = mock.patch.object(list_cache, "get_client", return_value=fakeredis.FakeRedis())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_not_modified_until_reservation_changes(self):
+        reservation = self.make_reservations(1)[0]
+        self.client.force_authenticate(self.user)
+        first = self.client.get("/api/reservation/reservations/")
+
+        with self.assertNumQueries(0):
+            response = self.client.get("/api/reservation/reservations/", HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(response.status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.get(f"/api/reservation/reservations/confirm/{reservation.confirmation_token}/")
+        response = self.client.get("/api/reservation/reservations/", HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], first["ETag"])
+
+
+@override_settings(OCCUPANCY_ENABLED=True)
+class OccupancyTests(SimpleTestCase):
+
+    def test_failed_update_unmarks_affected_days(self):
+        client = fakeredis.FakeRedis()
+        start_at = make_aware(datetime(2030, 1, 10, 23, 30))
+        slot = (1, start_at, start_at + timedelta(hours=1))
+        client.set(occupancy.ready_key(date(2030, 1, 10)), 1)
+        client.set(occupancy.ready_key(date(2030, 1, 11)), 1)
+        client.set(occupancy.ready_key(date(2030, 1, 12)), 1)
+
+        with mock.patch.object(occupancy, "get_client", return_value=client), \
+                mock.patch("redis.client.Pipeline.execute", side_effect=redis.ConnectionError), \
+                self.assertLogs("reservation.occupancy", "WARNING"):
+            occupancy.apply_changes([(None, slot)])
+
+        # Бронь через полночь: сняты оба дня, соседний не тронут
+        self.assertFalse(client.exists(occupancy.ready_key(date(2030, 1, 10))))
+        self.assertFalse(client.exists(occupancy.ready_key(date(2030, 1, 11))))
+        self.assertTrue(client.exists(occupancy.ready_key(date(2030, 1, 12))))
+
+
+    def test_rebuild_retries_when_day_changes_during_read(self):
+        client = fakeredis.FakeRedis()
+        day = date(2030, 1, 10)
+        start_at = make_aware(datetime(2030, 1, 10, 19, 0))
+        slot = (1, start_at, start_at + timedelta(hours=1))
+        reads = []
+
+        def load_intervals():
+            reads.append(1)
+            if len(reads) == 1:
+                # Бронь коммитится между чтением БД и записью дня
+                occupancy.apply_changes([(None, slot)])
+                return []
+            return [slot]
+
+        with mock.patch.object(occupancy, "get_client", return_value=client):
+            occupancy.rebuild_day(day, [1, 2], load_intervals)
+            self.assertEqual(len(reads), 2)
+            self.assertEqual(occupancy.free_tables([1, 2], *slot[1:]), {2})
+
+class ReservationTaskQueryTests(QueryCountTestCase):
+
+    def test_sweeper_queries_do_not_grow_with_due_rows(self):
+        # пакетная автоотмена (SAVEPOINT, UPDATE, RELEASE), затем SAVEPOINT,
+        # выборка с блокировкой, bulk_update, INSERT писем, RELEASE
+        for count in (3, 10):
+            Reservation.objects.all().delete()
+            self.make_reservations(count)
+            Reservation.objects.update(next_action_at=now() - timedelta(minutes=1))
+            with self.assertNumQueries(8):
+                self.assertEqual(sweep_reservation_actions(), {"reminder": count})
+        self.assertEqual(set(Reservation.objects.values_list("next_action", flat=True)), {"confirm_request"})
+
+    def test_sweeper_auto_cancels_unconfirmed(self):
+        pending, confirmed = self.make_reservations(2)
+        confirmed.status = "confirmed"
+        confirmed.save(update_fields=["status"])
+        Reservation.objects.update(next_action="auto_cancel", next_action_at=now() - timedelta(minutes=1))
+        self.assertEqual(sweep_reservation_actions(), {"auto_cancel": 1})
+        pending.refresh_from_db()
+        confirmed.refresh_from_db()
+        self.assertEqual((pending.status, pending.next_action), ("cancelled", None))
+        self.assertEqual((confirmed.status, confirmed.next_action), ("confirmed", None))
+
+    def test_sweeper_skips_ended_reservations(self):
+        yesterday = localtime(now() - timedelta(days=1))
+        ended = Reservation.objects.create(user=self.user, table=self.tables[0], date=yesterday.date(),
+                                           time=yesterday.time(), duration=60)
+        Reservation.objects.update(next_action="auto_cancel", next_action_at=yesterday)
+        self.assertEqual(sweep_reservation_actions(), {})
+        ended.refresh_from_db()
+        self.assertEqual((ended.status, ended.next_action), ("pending", None))
+        self.assertFalse(OutboxEmail.objects.filter(subject="Бронирование отменено").exists())
+
+    def test_auto_cancel(self):
+        reservation = self.make_reservations(1)[0]
+        # Бронь до перехода на sweeper: действия не запланированы, отменяет старая задача
+        Reservation.objects.update(next_action=None, next_action_at=None)
+        # выборка, SAVEPOINT, UPDATE статуса, UPDATE счётчика, INSERT письма, RELEASE
+        with self.assertNumQueries(6):
+            auto_cancel_reservation(reservation.id)
+        reservation.refresh_from_db()
+        self.assertEqual(reservation.status, "cancelled")
+        self.assertTrue(OutboxEmail.objects.filter(to=self.user.email, subject="Бронирование отменено").exists())
+
+    def test_legacy_auto_cancel_skips_sweeper_reservations(self):
+        reservation = self.make_reservations(1)[0]
+        auto_cancel_reservation(reservation.id)
+        reservation.refresh_from_db()
+        self.assertEqual(reservation.status, "pending")
+        self.assertFalse(OutboxEmail.objects.filter(subject="Бронирование отменено").exists())
+
+    def test_cancel_unconfirmed_in_one_update(self):
+        soon = localtime(now() + timedelta(minutes=10))
+        created = [
+            Reservation.objects.create(user=self.user, table=table, date=soon.date(),
+                                       time=soon.time(), duration=60, status=status)
+            for table, status in zip(self.tables, ("pending", "pending", "pending", "confirmed"))
+        ]
+        # Запрос подтверждения ушёл только первым двум, третья бронь создана в последний момент
+        Reservation.objects.filter(pk__in=[created[0].pk, created[1].pk]).update(
+            next_action=ACTION_AUTO_CANCEL, next_action_at=now()
+        )
+        later = self.make_reservations(1)[0]
+        # SAVEPOINT, UPDATE ... RETURNING, INSERT писем, UPDATE счётчика, RELEASE
+        with self.assertNumQueries(5):
+            self.assertEqual(cancel_unconfirmed(), 2)
+        self.assertEqual(Reservation.objects.filter(status="cancelled", next_action=None).count(), 2)
+        self.assertEqual(OutboxEmail.objects.filter(subject="Бронирование отменено").count(), 2)
+        for reservation in (created[2], later):
+            reservation.refresh_from_db()
+            self.assertEqual(reservation.status, "pending")
+
+    def test_reservation_created_signal(self):
+        # INSERT брони и INSERT письма в outbox
+        with self.assertNumQueries(2):
+            Reservation.objects.create(
+                user=self.user, table=self.tables[0], date=self.day, time=time(20, 0), duration=60
+            )
+
+
+class AvailabilityStreamTests(QueryCountTestCase):
+    url = "/api/reservation/availability/stream/?date=2030-01-01"
+
+    def test_rejected_under_wsgi(self):
+        token = AccessToken.for_user(self.user)
+        response = self.client.get(self.url, HTTP_AUTHORIZATION=f"Bearer {token}")
+        self.assertEqual(response.status_code, 501)
+
+    async def test_inactive_user_is_rejected(self):
+        token = str(AccessToken.for_user(self.user))
+        # Поток событий выключен: прошедший проверку пользователь получает 503
+        response = await AsyncClient().get(self.url, headers={"Authorization": f"Bearer {token}"})
+        self.assertEqual(response.status_code, 503)
+
+        await User.objects.filter(pk=self.user.pk).aupdate(is_active=False)
+        response = await AsyncClient().get(self.url, headers={"Authorization": f"Bearer {token}"})
+        self.assertEqual(response.status_code, 401)
+
+
+    async def test_reader_stops_when_last_subscriber_leaves(self):
+        broadcaster = streams.Broadcaster("redis://unused")
+        with mock.patch.object(streams.aioredis.Redis, "from_url", return_value=fakeredis.FakeAsyncRedis()):
+            queue = broadcaster.subscribe("availability:2030-01-01")
+            reader = broadcaster._reader
+            await asyncio.sleep(0.05)
+            self.assertFalse(reader.done())
+            broadcaster.unsubscribe("availability:2030-01-01", queue)
+            await asyncio.sleep(0.05)
+        self.assertTrue(reader.done())
+
+class ReservationAdminQueryTests(QueryCountTestCase):
+
+    def test_changelist_queries_do_not_grow_with_rows(self):
+        self.client.force_login(self.staff)
+        self.make_reservations(2)
+        # сессия, пользователь, два COUNT и одна выборка с JOIN
+        with self.assertNumQueries(5):
+            self.client.get("/admin/reservation/reservation/")
+        self.make_reservations(10)
+        with self.assertNumQueries(5):
+            self.client.get("/admin/reservation/reservation/")
+
+
+@override_settings(TABLE_CACHE_ENABLED=False)
+class GenerateDataTests(TestCase):
+
+    def test_peak_hours_and_planned_actions(self):
+        total = generate(tables=4, users=30, months=1, rng=random.Random(1), ahead_days=14)
+        self.assertEqual(Reservation.objects.count(), total)
+
+        def at(hour):
+            return Reservation.objects.filter(time__gte=time(hour), time__lt=time(hour + 1)).count()
+
+        self.assertGreater(at(19), 3 * at(10))
+        future = Reservation.objects.filter(status__in=Reservation.ACTIVE_STATUSES, start_at__gt=now() + timedelta(hours=2))
+        self.assertTrue(future.exists())
+        self.assertFalse(future.filter(next_action=None).exists())
+        self.assertFalse(Reservation.objects.filter(status="pending", start_at__lte=now()).exists())
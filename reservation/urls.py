@@ -1,7 +1,11 @@
+from django.urls import path
 from rest_framework.routers import DefaultRouter
+from .streams import availability_stream
 from .views import ReservationViewSet
 
 router = DefaultRouter()
 router.register(r"reservations", ReservationViewSet, basename="reservation")
 
-urlpatterns = router.urls
+urlpatterns = [
+    path("availability/stream/", availability_stream, name="availability-stream"),
+] + router.urls
@@ -1,12 +1,6 @@
-from django.core.mail import send_mail
 from django.conf import settings
+from notifications.utils import enqueue_email
 
 def send_email(to_email, subject, message):
-    """ Функция для отправки email. """
-    send_mail(
-        subject,
-        message,
-        settings.DEFAULT_FROM_EMAIL,
-        [to_email],
-        fail_silently=False,
-    )
+    """ Ставит email в исходящую очередь (в текущей транзакции). """
+    enqueue_email(to_email, subject, message, settings.DEFAULT_FROM_EMAIL)
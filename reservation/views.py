@@ -2,22 +2,42 @@ from rest_framework import viewsets, status
 from rest_framework.generics import get_object_or_404
 from rest_framework.response import Response
 from rest_framework.decorators import action
-from rest_framework.permissions import IsAuthenticated, AllowAny
+from rest_framework.permissions import IsAuthenticated, IsAdminUser, AllowAny
+from rest_framework.renderers import BrowsableAPIRenderer
+from django_filters.rest_framework import DjangoFilterBackend
+from tables.serializers import TableSerializer
+from .availability import find_available_tables
+from . import list_cache, sync
+from .bulk import create_batch
+from .filters import ReservationFilter
 from .models import Reservation
+from .pagination import ReservationPagination
+from .rows import ORJSONRenderer, ValuesReadMixin, compile_mapper
 from .serializers import (
+    AvailabilityQuerySerializer,
+    ReservationBulkCreateSerializer,
     ReservationCreateSerializer,
     ReservationUpdateSerializer,
     ReservationCancelSerializer,
 )
 
-class ReservationViewSet(viewsets.ModelViewSet):
+class ReservationViewSet(ValuesReadMixin, viewsets.ModelViewSet):
     """ ViewSet для бронирований. """
     queryset = Reservation.objects.all()
     permission_classes = [IsAuthenticated]
-
-    def get_queryset(self):
-        """ Фильтруем бронирования по текущему пользователю. """
-        return Reservation.objects.filter(user=self.request.user)
+    renderer_classes = [ORJSONRenderer, BrowsableAPIRenderer]
+    # Те же поля, что у ReservationCreateSerializer, но из .values()
+    read_fields = (("id", "id"), ("table", "table_id"), ("date", "date"), ("time", "time"), ("duration", "duration"))
+    optional_read_fields = (("status", "status"), ("created_at", "created_at"), ("user", "user_id"))
+    expandable_fields = {
+        "table": (("id", "table__id"), ("number", "table__number"), ("seats", "table__seats"), ("type", "table__type")),
+        "user": (("id", "user__id"), ("email", "user__email")),
+    }
+    # Для синхронизации клиенту нужен статус и время изменения
+    sync_fields = read_fields + (("status", "status"), ("updated_at", "updated_at"))
+    pagination_class = ReservationPagination
+    filter_backends = [DjangoFilterBackend]
+    filterset_class = ReservationFilter
 
     def get_serializer_class(self):
         """ Выбираем сериализатор в зависимости от действия. """
@@ -27,6 +47,18 @@ class ReservationViewSet(viewsets.ModelViewSet):
             return ReservationUpdateSerializer
         return ReservationCreateSerializer
 
+    def list(self, request, *args, **kwargs):
+        """
+        Список «мои брони» с ETag: опрос без изменений отвечает 304 по метке
+        версии в Redis. Администраторы видят все брони — им без кэша.
+        """
+        if request.user.is_staff:
+            return Response(self.read_list(request))
+        return list_cache.conditional_response(request, lambda: self.read_list(request))
+
+    def retrieve(self, request, *args, **kwargs):
+        return Response(self.read_detail(request))
+
     def perform_create(self, serializer):
         """ Привязываем бронирование к текущему пользователю. """
         serializer.save(user=self.request.user)
@@ -40,6 +72,49 @@ class ReservationViewSet(viewsets.ModelViewSet):
         serializer.save()
         return Response({"detail": "Бронирование отменено."}, status=status.HTTP_200_OK)
 
+    @action(detail=False, methods=["post"], permission_classes=[IsAdminUser])
+    def bulk(self, request):
+        """
+        Пакетное бронирование столиков для банкетов и мероприятий.
+        """
+        serializer = ReservationBulkCreateSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        created, rejected = create_batch(
+            request.user, serializer.validated_data["reservations"], serializer.validated_data["mode"]
+        )
+        return Response(
+            {"created": [reservation.id for reservation in created], "rejected": rejected},
+            status=status.HTTP_201_CREATED if created else status.HTTP_400_BAD_REQUEST,
+        )
+
+    @action(detail=False, methods=["get"], url_path="sync")
+    def sync_changes(self, request):
+        """
+        Дельта-синхронизация: ?since=<cursor> из прошлого ответа возвращает
+        только изменённые после него брони и id удалённых. Пока has_more,
+        клиент сразу запрашивает следующую страницу с новым курсором.
+        """
+        since, continuation = sync.decode_cursor(request.query_params.get("since"))
+        queryset = self.get_queryset().values(*(source for _, source in self.sync_fields))
+        rows, deleted, cursor, has_more = sync.changes_since(
+            queryset, since, user=None if request.user.is_staff else request.user, continuation=continuation
+        )
+        map_row = compile_mapper(self.sync_fields)
+        return Response({
+            "cursor": cursor, "has_more": has_more,
+            "changed": [map_row(row) for row in rows], "deleted": deleted,
+        })
+
+    @action(detail=False, methods=["get"])
+    def availability(self, request):
+        """
+        Поиск свободных столиков на дату, время и длительность за один запрос.
+        """
+        query = AvailabilityQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        tables = find_available_tables(**query.validated_data)
+        return Response(TableSerializer(tables, many=True).data, status=status.HTTP_200_OK)
+
     @action(detail=False, methods=["get"], url_path="confirm/(?P<token>[0-9a-f-]+)", permission_classes=[AllowAny])
     def confirm_reservation(self, request, token=None):
         """
@@ -52,7 +127,7 @@ class ReservationViewSet(viewsets.ModelViewSet):
                             status=status.HTTP_400_BAD_REQUEST)
 
         reservation.status = "confirmed"
-        reservation.save()
+        reservation.save(update_fields=["status"])
 
         return Response({"message": "Бронирование подтверждено!"}, status=status.HTTP_200_OK)
 
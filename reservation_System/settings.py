@@ -37,15 +37,21 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
     'users',
     'tables',
     'reservation',
+    'notifications',
+    'monitoring',
     'rest_framework_simplejwt',
 
 ]
 
 MIDDLEWARE = [
+    'monitoring.middleware.RequestIdMiddleware',
+    'monitoring.middleware.RequestMetricsMiddleware',
+    'monitoring.middleware.SlowQueryMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -75,6 +81,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'reservation_System.wsgi.application'
+ASGI_APPLICATION = 'reservation_System.asgi.application'
 
 
 # Database
@@ -137,7 +144,7 @@ AUTH_USER_MODEL = "users.User"
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "users.authentication.CachedJWTAuthentication",
     ),
 }
 
@@ -160,17 +167,38 @@ SIMPLE_JWT = {
 SITE_URL = "http://localhost:8000"
 
 
+# JSON-строки пишет отдельный поток (monitoring.log.AsyncJsonHandler), в запросе — только постановка в очередь.
+# SQL-лог django.db.backends при включении на DEBUG сэмплируется.
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
+    'filters': {
+        'request_id': {
+            '()': 'monitoring.log.RequestIdFilter',
+        },
+        'sampling': {
+            '()': 'monitoring.log.SamplingFilter',
+            'rates': {'django.db.backends': 0.01},
+        },
+    },
     'handlers': {
-        'console': {
-            'class': 'logging.StreamHandler',
+        'async_json': {
+            'class': 'monitoring.log.AsyncJsonHandler',
+            'filters': ['sampling', 'request_id'],
+            'stream': 'ext://sys.stderr',
         },
     },
     'root': {
-        'handlers': ['console'],
-        'level': 'DEBUG',
+        'handlers': ['async_json'],
+        'level': 'INFO',
+    },
+    'loggers': {
+        # Иначе при DEBUG=True Django дублирует свои записи в консоль синхронно
+        'django': {
+            'handlers': ['async_json'],
+            'level': 'INFO',
+            'propagate': False,
+        },
     },
 }
 
@@ -181,3 +209,74 @@ CELERY_ACCEPT_CONTENT = ["json"]
 CELERY_TASK_SERIALIZER = "json"
 CELERY_ENABLE_UTC = False
 CELERY_TIMEZONE = "Asia/Almaty"
+# Воркер пишет логи через LOGGING Django, а не через свои обработчики
+CELERY_WORKER_HIJACK_ROOT_LOGGER = False
+
+# Исходящая почта: письма пишутся в outbox и отправляются пачками
+OUTBOX_BATCH_SIZE = 100
+OUTBOX_MAX_ATTEMPTS = 8
+# Сколько письмо считается захваченным воркером; после — его заберёт другой
+OUTBOX_LEASE_SECONDS = 300
+
+CELERY_BEAT_SCHEDULE = {
+    "drain-email-outbox": {
+        "task": "notifications.tasks.drain_outbox",
+        "schedule": 10.0,
+    },
+    "sweep-reservation-actions": {
+        "task": "reservation.tasks.sweep_reservation_actions",
+        "schedule": 60.0,
+    },
+    "prune-sync-tombstones": {
+        "task": "reservation.tasks.prune_sync_tombstones",
+        "schedule": 24 * 60 * 60.0,
+    },
+}
+
+# Напоминания и автоотмены: sweeper выбирает наступившие действия пачками
+RESERVATION_SWEEP_BATCH_SIZE = 500
+
+# Занятость столиков по 5-минутным слотам в том же Redis
+OCCUPANCY_ENABLED = True
+OCCUPANCY_REDIS_URL = CELERY_BROKER_URL
+
+# Каталог столиков: версия и данные в Redis, перед ними LRU процесса
+TABLE_CACHE_ENABLED = True
+TABLE_CACHE_REDIS_URL = CELERY_BROKER_URL
+TABLE_CACHE_LOCAL_SIZE = 256
+
+# Список «мои брони»: метка версии и страницы в Redis
+RESERVATION_LIST_CACHE_ENABLED = True
+RESERVATION_LIST_CACHE_REDIS_URL = CELERY_BROKER_URL
+
+# Дельта-синхронизация: запас курсора на долгие транзакции и срок хранения удалений
+SYNC_LAG_SECONDS = 60
+SYNC_TOMBSTONE_DAYS = 30
+# Строк изменений на страницу синхронизации; дальше — has_more и курсор продолжения
+SYNC_PAGE_SIZE = 500
+
+# Пользователь из JWT: несколько секунд в процессе, минуты в Redis. Деактивация и смена
+# пароля доходят до других процессов за AUTH_USER_CACHE_LOCAL_SECONDS; 0 — без кэша процесса
+AUTH_USER_CACHE_ENABLED = True
+AUTH_USER_CACHE_REDIS_URL = CELERY_BROKER_URL
+AUTH_USER_CACHE_SECONDS = 300
+AUTH_USER_CACHE_LOCAL_SECONDS = 5
+
+# События изменения слотов для SSE-подписчиков (Redis pub/sub)
+AVAILABILITY_EVENTS_ENABLED = True
+AVAILABILITY_EVENTS_REDIS_URL = CELERY_BROKER_URL
+
+# Метрики запросов для Prometheus (/metrics): с DEBUG=False отдаются только по
+# заголовку Authorization: Bearer <METRICS_TOKEN>, без токена endpoint закрыт
+METRICS_ENABLED = True
+METRICS_TOKEN = None
+# Очереди брокера для celery_queue_length и число последних замеров задач в Redis
+TASK_METRICS_QUEUES = ["celery"]
+TASK_METRICS_SAMPLES = 500
+
+# Журнал медленных запросов (включать при разборе), худшие — на /admin/slow-queries/
+SLOW_QUERY_ENABLED = False
+SLOW_QUERY_REDIS_URL = CELERY_BROKER_URL
+SLOW_QUERY_THRESHOLD_MS = 200
+SLOW_QUERY_EXPLAIN_RATE = 0.1
+SLOW_QUERY_KEEP = 100
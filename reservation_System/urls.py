@@ -1,10 +1,14 @@
 from django.contrib import admin
 from django.urls import path, include
+from monitoring.views import metrics_view, slow_queries_view
 
 urlpatterns = [
+    path('admin/slow-queries/', admin.site.admin_view(slow_queries_view), name='slow-queries'),
     path('admin/', admin.site.urls),
     path('api/user/', include('users.urls')),
     path('api/reservation/', include('reservation.urls')),
+    path('api/table/', include('tables.urls')),
+    path('metrics', metrics_view, name='metrics'),
 ]
 
 
@@ -0,0 +1,145 @@
+"""
+Кэш каталога столиков. Каталог меняется несколько раз в месяц, а читается
+при каждой проверке доступности и загрузке формы брони, поэтому данные
+кэшируются по версии: номер версии живёт в Redis и увеличивается при любом
+изменении столика, а сами данные лежат в LRU процесса и в Redis под ключом
+с версией. Старые версии просто перестают читаться и истекают по TTL.
+Если Redis недоступен, всё читается из БД как раньше.
+"""
+import hashlib
+import json
+import logging
+import threading
+from collections import OrderedDict
+from datetime import timedelta
+
+import redis
+from django.conf import settings
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import Table
+
+logger = logging.getLogger(__name__)
+
+VERSION_KEY = "tables:catalogue:version"
+DATA_TTL = timedelta(days=1)
+
+_client = None
+
+
+class LocalLRU:
+    """ Потокобезопасный LRU процесса: (версия, имя) -> данные. """
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._items:
+                return None
+            self._items.move_to_end(key)
+            return self._items[key]
+
+    def set(self, key, value):
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+
+local = LocalLRU(getattr(settings, "TABLE_CACHE_LOCAL_SIZE", 256))
+
+
+def get_client():
+    global _client
+    if _client is None:
+        _client = redis.Redis.from_url(
+            settings.TABLE_CACHE_REDIS_URL, socket_timeout=0.2, socket_connect_timeout=0.2
+        )
+    return _client
+
+
+def enabled():
+    return getattr(settings, "TABLE_CACHE_ENABLED", False)
+
+
+def current_version():
+    """ Текущая версия каталога или None, если кэш выключен или Redis недоступен. """
+    if not enabled():
+        return None
+    try:
+        return int(get_client().get(VERSION_KEY) or 0)
+    except redis.RedisError:
+        logger.warning("Redis недоступен, каталог столиков читается из БД", exc_info=True)
+        return None
+
+
+def bump_version():
+    """ Новая версия каталога: все закэшированные данные становятся неактуальными. """
+    local.clear()
+    if not enabled():
+        return
+    try:
+        get_client().incr(VERSION_KEY)
+    except redis.RedisError:
+        logger.warning("Не удалось обновить версию каталога столиков", exc_info=True)
+
+
+def data_key(version, name):
+    return f"tables:catalogue:{version}:{hashlib.sha1(name.encode()).hexdigest()}"
+
+
+def etag(version, name):
+    return f'"tables-{version}-{hashlib.sha1(name.encode()).hexdigest()[:16]}"'
+
+
+def get_or_build(version, name, build):
+    """ Данные name для версии version: LRU процесса, затем Redis, затем build(). """
+    if version is None:
+        return build()
+    data = local.get((version, name))
+    if data is not None:
+        return data
+    key = data_key(version, name)
+    try:
+        raw = get_client().get(key)
+    except redis.RedisError:
+        raw = None
+    if raw is not None:
+        data = json.loads(raw)
+    else:
+        data = build()
+        try:
+            get_client().set(key, json.dumps(data, default=str), ex=DATA_TTL)
+        except redis.RedisError:
+            logger.warning("Не удалось сохранить каталог столиков в Redis", exc_info=True)
+    local.set((version, name), data)
+    return data
+
+
+def conditional_response(request, name, build):
+    """
+    Ответ из кэша с ETag. Если клиент прислал актуальный If-None-Match —
+    304 без обращения к данным.
+    """
+    version = current_version()
+    if version is None:
+        return Response(build())
+    tag = etag(version, name)
+    if request.headers.get("If-None-Match") == tag:
+        return Response(status=status.HTTP_304_NOT_MODIFIED, headers={"ETag": tag})
+    return Response(get_or_build(version, name, build), headers={"ETag": tag})
+
+
+def all_tables():
+    """ Все столики каталога как несохраняемые экземпляры Table. """
+    rows = get_or_build(current_version(), "rows", lambda: list(Table.objects.order_by("number").values()))
+    return [Table(**row) for row in rows]
@@ -20,5 +20,10 @@ class Table(models.Model):
     type = models.CharField(max_length=20, choices=TYPE_CHOICES, verbose_name="Тип столика")
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="available", verbose_name="Статус")
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["type", "seats"], name="table_type_seats_idx"),
+        ]
+
     def __str__(self):
         return f"Стол {self.number} ({self.get_type_display()})"
@@ -0,0 +1,5 @@
+from reservation.pagination import KeysetPagination
+
+
+class TablePagination(KeysetPagination):
+    ordering = ("number", "id")
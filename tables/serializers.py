@@ -5,3 +5,10 @@ class TableSerializer(serializers.ModelSerializer):
     class Meta:
         model = Table
         fields = "__all__"
+
+
+class HeatmapQuerySerializer(serializers.Serializer):
+    """ Параметры карты занятости зала. """
+    date = serializers.DateField()
+    days = serializers.IntegerField(min_value=1, max_value=7, default=7)
+
@@ -0,0 +1,12 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from . import cache
+from .models import Table
+
+
+@receiver(post_save, sender=Table)
+@receiver(post_delete, sender=Table)
+def table_catalogue_changed(sender, instance, **kwargs):
+    """ Любое изменение столика (включая set_status) — новая версия каталога после коммита. """
+    transaction.on_commit(cache.bump_version)
@@ -1,3 +1,84 @@
-from django.test import TestCase
+from datetime import date, time
+from unittest import mock
 
-# Create your tests here.
+import fakeredis
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from reservation.models import Reservation
+from users.models import User
+from . import cache
+from .models import Table
+
+
+@override_settings(TABLE_CACHE_ENABLED=True)
+class TableCatalogueCacheTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user("admin@example.com", "+70000000002", "secret123", is_staff=True)
+        cls.table = Table.objects.create(number=1, seats=4, type="standard")
+
+    def setUp(self):
+        patcher = mock.patch.object(cache, "get_client", return_value=fakeredis.FakeRedis())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        cache.local.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.staff)
+
+    def test_etag_and_not_modified(self):
+        url = f"/api/table/tables/{self.table.id}/"
+        first = self.client.get(url)
+        self.assertEqual(first.data["seats"], 4)
+
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(response.status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(f"/api/table/tables/{self.table.id}/set-status/", {"status": "unavailable"})
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["status"], "unavailable")
+
+
+    def test_sparse_detail_is_cached_separately(self):
+        url = f"/api/table/tables/{self.table.id}/"
+        sparse = self.client.get(url, {"fields": "id"})
+        self.assertEqual(sparse.json(), {"id": self.table.id})
+
+        full = self.client.get(url, HTTP_IF_NONE_MATCH=sparse["ETag"])
+        self.assertEqual(full.status_code, 200)
+        self.assertEqual(full.json()["seats"], 4)
+        self.assertEqual(self.client.get(url, {"fields": "id"}).json(), {"id": self.table.id})
+
+class HeatmapTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user("admin@example.com", "+70000000002", "secret123", is_staff=True)
+        cls.table = Table.objects.create(number=1, seats=4, type="standard")
+        Table.objects.create(number=2, seats=2, type="standard")
+        day = date(2030, 1, 1)
+        Reservation.objects.create(user=cls.staff, table=cls.table, date=day, time=time(10, 0), duration=60)
+        # Через полночь: 23:30–00:30
+        Reservation.objects.create(user=cls.staff, table=cls.table, date=day, time=time(23, 30), duration=60,
+                                   status="confirmed")
+
+    def test_pending_confirmed_and_midnight_runs(self):
+        client = APIClient()
+        client.force_authenticate(self.staff)
+        response = client.get("/api/table/tables/heatmap/", {"date": "2030-01-01", "days": 2})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "application/json")
+        data = response.json()
+        self.assertEqual(data["legend"], {"0": "free", "1": "pending", "2": "confirmed"})
+        self.assertEqual(data["slot_minutes"], 5)
+        busy, free = data["tables"]
+        self.assertEqual(busy["runs"], [[0, 120], [1, 12], [0, 150], [2, 12], [0, 282]])
+        self.assertEqual(free["runs"], [[0, 576]])
+
+        # День после брони через полночь начинается с её хвоста
+        response = client.get("/api/table/tables/heatmap/", {"date": "2030-01-02", "days": 1})
+        self.assertEqual(response.json()["tables"][0]["runs"], [[2, 6], [0, 282]])
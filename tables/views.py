@@ -1,14 +1,21 @@
+from urllib.parse import urlencode
+
 from rest_framework.decorators import action
 from rest_framework import viewsets, status
 from rest_framework.permissions import IsAdminUser
+from rest_framework.renderers import BrowsableAPIRenderer
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
+from . import cache
 from .models import Table
 import reservation.models
-from .serializers import TableSerializer
+from reservation.rows import ORJSONRenderer, ValuesReadMixin
+from .serializers import TableSerializer, HeatmapQuerySerializer
 from .filters import TableFilter
+from .pagination import TablePagination
+from .heatmap import build_heatmap
 
-class TableViewSet(viewsets.ModelViewSet):
+class TableViewSet(ValuesReadMixin, viewsets.ModelViewSet):
     """
     API для управления столиками (только для администраторов).
     """
@@ -17,6 +24,28 @@ class TableViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAdminUser]
     filter_backends = [DjangoFilterBackend]
     filterset_class = TableFilter
+    pagination_class = TablePagination
+    renderer_classes = [ORJSONRenderer, BrowsableAPIRenderer]
+    read_fields = (("id", "id"), ("number", "number"), ("seats", "seats"), ("type", "type"), ("status", "status"))
+
+    def list(self, request, *args, **kwargs):
+        """ Список из кэша каталога; ключ — полный URL с фильтрами и курсором. """
+        return cache.conditional_response(
+            request, f"list:{request.build_absolute_uri()}",
+            lambda: self.read_list(request),
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        """ Столик из кэша каталога. """
+        # ?fields=/?expand= меняют ответ, поэтому входят в ключ и ETag
+        params = sorted(
+            (name, request.query_params[name]) for name in (self.fields_query_param, self.expand_query_param)
+            if request.query_params.get(name)
+        )
+        return cache.conditional_response(
+            request, f"detail:{kwargs['pk']}?{urlencode(params)}",
+            lambda: self.read_detail(request),
+        )
 
     def destroy(self, request, *args, **kwargs):
         """
@@ -50,3 +79,14 @@ class TableViewSet(viewsets.ModelViewSet):
         table.save()
 
         return Response({"message": f"Статус столика {table.number} изменён на {new_status}."})
+
+    @action(detail=False, methods=["get"])
+    def heatmap(self, request):
+        """
+        Карта занятости зала: столики × 5-минутные слоты на день или неделю,
+        строки сжаты в run-length пары [статус, длина].
+        """
+        query = HeatmapQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        return Response(build_heatmap(query.validated_data["date"], query.validated_data["days"]))
+
@@ -0,0 +1,164 @@
+"""
+JWT-аутентификация без запроса к users_user на каждый запрос: пользователь
+по user_id из токена кэшируется на несколько секунд в процессе и на минуты
+в Redis. Сохранение и удаление пользователя (деактивация, сброс пароля,
+изменение счётчика броней) сбрасывают запись в Redis и в текущем процессе.
+
+Локальная запись других процессов не сбрасывается: там деактивированный
+пользователь или старый пароль ещё действуют до AUTH_USER_CACHE_LOCAL_SECONDS.
+Если такое окно недопустимо, AUTH_USER_CACHE_LOCAL_SECONDS = 0 отключает
+кэш процесса — остаётся один GET в Redis на запрос.
+
+В Redis лежит JSON с полями CACHED_FIELDS; остальные поля у собранного
+пользователя отложены и при обращении догружаются из БД.
+"""
+import json
+import logging
+import threading
+import time
+
+import redis
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+logger = logging.getLogger(__name__)
+
+# Всё, что нужно аутентификации, правам и лимиту броней; токены из писем не кэшируем
+CACHED_FIELDS = (
+    "id", "email", "phone", "first_name", "last_name", "password", "last_login",
+    "is_active", "is_staff", "is_superuser", "is_verified", "active_reservations_count",
+)
+
+_client = None
+_local = {}
+_local_lock = threading.Lock()
+
+
+def get_client():
+    global _client
+    if _client is None:
+        _client = redis.Redis.from_url(
+            settings.AUTH_USER_CACHE_REDIS_URL, socket_timeout=0.2, socket_connect_timeout=0.2
+        )
+    return _client
+
+
+def enabled():
+    return getattr(settings, "AUTH_USER_CACHE_ENABLED", False)
+
+
+def cache_key(user_id):
+    return f"auth:user:{user_id}"
+
+
+def invalidate(user_ids):
+    """ Сбрасывает закэшированных пользователей в процессе и в Redis. """
+    user_ids = set(user_ids)
+    if not user_ids:
+        return
+    with _local_lock:
+        for user_id in user_ids:
+            _local.pop(str(user_id), None)
+    if not enabled():
+        return
+    try:
+        get_client().delete(*(cache_key(user_id) for user_id in user_ids))
+    except redis.RedisError:
+        logger.warning("Не удалось сбросить кэш пользователей", exc_info=True)
+
+
+def fields_of(user):
+    return {name: getattr(user, name) for name in CACHED_FIELDS}
+
+
+def dumps(user):
+    return json.dumps(fields_of(user), cls=DjangoJSONEncoder)
+
+
+def parse(user_model, raw):
+    """ JSON кэша -> значения CACHED_FIELDS в типах полей модели. """
+    data = json.loads(raw)
+    return {
+        field.attname: field.to_python(data[field.attname])
+        for field in user_model._meta.concrete_fields if field.attname in CACHED_FIELDS
+    }
+
+
+def build(user_model, fields):
+    """ Новый пользователь из значений полей, как после выборки .only(*CACHED_FIELDS). """
+    # from_db ждёт значения в порядке полей модели
+    names = [field.attname for field in user_model._meta.concrete_fields if field.attname in fields]
+    return user_model.from_db(None, names, [fields[name] for name in names])
+
+
+def loads(user_model, raw):
+    return build(user_model, parse(user_model, raw))
+
+
+def _remember_locally(user_id, fields):
+    if settings.AUTH_USER_CACHE_LOCAL_SECONDS <= 0:
+        return
+    with _local_lock:
+        _local[user_id] = (time.monotonic() + settings.AUTH_USER_CACHE_LOCAL_SECONDS, fields)
+
+
+def load_user(user_model, user_id):
+    """
+    Пользователь из локального кэша, Redis или БД. DoesNotExist — если его нет.
+    В процессе хранятся значения полей, а не модель: каждый запрос получает
+    свой экземпляр, и изменения request.user не видны другим потокам.
+    """
+    user_id = str(user_id)
+    if not enabled():
+        return user_model.objects.get(**{api_settings.USER_ID_FIELD: user_id})
+
+    with _local_lock:
+        cached = _local.get(user_id)
+    if cached and cached[0] > time.monotonic():
+        return build(user_model, cached[1])
+
+    try:
+        raw = get_client().get(cache_key(user_id))
+    except redis.RedisError:
+        raw = None
+    if raw is not None:
+        fields = parse(user_model, raw)
+        user = build(user_model, fields)
+    else:
+        user = user_model.objects.get(**{api_settings.USER_ID_FIELD: user_id})
+        fields = fields_of(user)
+        try:
+            get_client().set(cache_key(user_id), dumps(user), ex=settings.AUTH_USER_CACHE_SECONDS)
+        except redis.RedisError:
+            logger.warning("Не удалось сохранить пользователя в кэш", exc_info=True)
+    _remember_locally(user_id, fields)
+    return user
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """ JWTAuthentication, который берёт пользователя из кэша (см. load_user). """
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(_("Token contained no recognizable user identification")) from e
+
+        try:
+            user = load_user(self.user_model, user_id)
+        except self.user_model.DoesNotExist as e:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found") from e
+
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
+
+        return user
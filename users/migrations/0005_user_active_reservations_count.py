@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:08
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_active_reservations(apps, schema_editor):
+    """ Начальные значения счётчика из таблицы броней. """
+    User = apps.get_model("users", "User")
+    Reservation = apps.get_model("reservation", "Reservation")
+    User.objects.update(active_reservations_count=Coalesce(Subquery(
+        Reservation.objects.filter(user=OuterRef("pk"), status__in=("pending", "confirmed"))
+        .order_by().values("user").annotate(total=Count("id")).values("total")
+    ), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0004_user_is_active_user_is_staff_alter_user_is_superuser'),
+        ('reservation', '0006_reservation_next_action'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='active_reservations_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(count_active_reservations, reverse_code=migrations.RunPython.noop),
+    ]
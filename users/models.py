@@ -41,8 +41,20 @@ class User(AbstractBaseUser, PermissionsMixin):
     verification_token = models.CharField(max_length=100, blank=True, null=True)
     reset_token = models.CharField(max_length=100, blank=True, null=True)
 
+    # Денормализованный счётчик активных броней для лимита (см. reservation/counters.py)
+    active_reservations_count = models.PositiveIntegerField(default=0, editable=False)
+
     objects = CustomUserManager()
 
+    class Meta:
+        indexes = [
+            # Поиск по токенам из писем; у большинства пользователей токенов нет
+            models.Index(fields=["verification_token"], condition=models.Q(verification_token__isnull=False),
+                         name="user_verification_token_idx"),
+            models.Index(fields=["reset_token"], condition=models.Q(reset_token__isnull=False),
+                         name="user_reset_token_idx"),
+        ]
+
     USERNAME_FIELD = "email"
     REQUIRED_FIELDS = ["phone"]
 
@@ -0,0 +1,13 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from . import authentication
+
+
+@receiver(post_save, sender=get_user_model())
+@receiver(post_delete, sender=get_user_model())
+def user_changed(sender, instance, **kwargs):
+    """ Сохранение (деактивация, сброс пароля, подтверждение почты) и удаление сбрасывают кэш аутентификации. """
+    user_id = instance.pk  # после delete() pk обнуляется раньше on_commit
+    transaction.on_commit(lambda: authentication.invalidate([user_id]))
@@ -1,3 +1,58 @@
-from django.test import TestCase
+import json
+from unittest import mock
 
-# Create your tests here.
+import fakeredis
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from . import authentication
+from .models import User
+
+
+@override_settings(AUTH_USER_CACHE_ENABLED=True)
+class CachedJWTAuthenticationTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user("guest@example.com", "+70000000001", "secret123")
+        self.redis = fakeredis.FakeRedis()
+        patcher = mock.patch.object(authentication, "get_client", return_value=self.redis)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(authentication._local.clear)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(self.user)}")
+
+    def test_steady_traffic_skips_user_query(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get("/api/user/users/me/").status_code, 200)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get("/api/user/users/me/").status_code, 200)
+
+        # Процесс без локальной записи берёт пользователя из Redis
+        authentication._local.clear()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get("/api/user/users/me/").status_code, 200)
+
+    def test_each_call_gets_own_instance(self):
+        first = authentication.load_user(User, self.user.pk)
+        first.first_name = "changed"
+        second = authentication.load_user(User, self.user.pk)
+        self.assertIsNot(first, second)
+        self.assertEqual(second.first_name, self.user.first_name)
+
+    def test_cached_as_json_fields(self):
+        self.client.get("/api/user/users/me/")
+        cached = json.loads(self.redis.get(authentication.cache_key(self.user.pk)))
+        self.assertEqual(set(cached), set(authentication.CACHED_FIELDS))
+        user = authentication.loads(User, json.dumps(cached))
+        self.assertEqual((user.pk, user.email, user.is_active), (self.user.pk, self.user.email, True))
+        self.assertFalse(user._state.adding)
+
+    def test_deactivation_invalidates(self):
+        self.client.get("/api/user/users/me/")
+        self.user.is_active = False
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.save()
+        self.assertEqual(self.redis.keys(), [])
+        self.assertEqual(self.client.get("/api/user/users/me/").status_code, 401)
@@ -3,6 +3,7 @@ from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.decorators import action
 import uuid
+from django.db import transaction
 from .models import User
 from .serializers import UserSerializer, UserRegistrationSerializer, UserLoginSerializer, ResetPasswordSerializer
 from .utils import send_verification_email, send_reset_password_email
@@ -17,11 +18,12 @@ class UserViewSet(viewsets.ViewSet):
         """Регистрация пользователя."""
         serializer = UserRegistrationSerializer(data=request.data)
         if serializer.is_valid():
-            user = serializer.save()
-            user.is_verified = False
-            user.verification_token = str(uuid.uuid4())  # Генерируем токен
-            user.save()
-            send_verification_email(user.email, user.verification_token)  # Отправляем email
+            with transaction.atomic():
+                user = serializer.save()
+                user.is_verified = False
+                user.verification_token = str(uuid.uuid4())  # Генерируем токен
+                user.save()
+                send_verification_email(user.email, user.verification_token)  # Письмо в outbox
             return Response({"message": "На вашу почту отправлено письмо для подтверждения."})
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -72,9 +74,10 @@ class UserViewSet(viewsets.ViewSet):
         email = request.data.get("email")
         try:
             user = User.objects.get(email=email)
-            user.reset_token = str(uuid.uuid4())
-            user.save()
-            send_reset_password_email(user.email, user.reset_token)
+            with transaction.atomic():
+                user.reset_token = str(uuid.uuid4())
+                user.save()
+                send_reset_password_email(user.email, user.reset_token)
             return Response({"message": "На почту отправлено письмо с инструкцией по сбросу пароля."})
         except User.DoesNotExist:
             return Response({"error": "Пользователь с таким email не найден."}, status=status.HTTP_404_NOT_FOUND)